@@ -0,0 +1,263 @@
+"""
+HyperFlex Edge Policy Maker Benchmark, v1.0
+Summary: Measures the per-call latency of the Intersight Universal Functions and the end-to-end HyperFlex policy
+provisioning throughput for 1 to N clusters against the local mock Intersight server, so that performance
+regressions can be caught offline without access to intersight.com.
+Notes: Requires the Intersight SDK for Python. A throwaway RSA key is generated for request signing.
+"""
+
+# Import needed Python modules
+import sys
+import os
+import json
+import argparse
+import logging
+import statistics
+import tempfile
+import time
+import uuid
+import hx_policy_maker
+from mock_intersight_server import MockIntersightServer
+
+
+def write_private_key(key_path):
+  """This is a function to write a throwaway RSA private key for signing requests to the mock Intersight server.
+
+  Args:
+    key_path: The path of the private key file to be written.
+  """
+  try:
+    from Crypto.PublicKey import RSA
+    private_key = RSA.generate(2048).exportKey("PEM")
+  except ImportError:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048).private_bytes(
+      serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption())
+  os.makedirs(os.path.dirname(key_path), exist_ok=True)
+  with open(key_path, "wb") as key_file:
+    key_file.write(private_key)
+
+
+def write_benchmark_sessions(work_directory,cluster_count):
+  """This is a function to write the session.xml files, cluster.xml files and API keys for a benchmark run. Each
+  session is assigned its own cluster, which is found by the cluster inventory of the HyperFlex Edge Policy Maker
+  script.
+
+  Args:
+    work_directory: The directory in which the benchmark files are written.
+    cluster_count: The number of sessions and clusters to be written.
+
+  Returns:
+    A tuple containing the directory of session.xml files and the clusters directory.
+  """
+  run_directory = os.path.join(work_directory, "run-" + uuid.uuid4().hex[:8])
+  sessions_directory = os.path.join(run_directory, "sessions")
+  clusters_directory = os.path.join(run_directory, "Clusters")
+  os.makedirs(sessions_directory)
+  for cluster_number in range(1, cluster_count + 1):
+    cluster_name = "Benchmark Cluster " + str(cluster_number).zfill(4)
+    cluster_xml_file = "cluster" + str(cluster_number).zfill(4) + ".xml"
+    cluster_directory = os.path.join(clusters_directory, "BENCH", cluster_name)
+    os.makedirs(os.path.join(cluster_directory, "XML_File"))
+    with open(os.path.join(cluster_directory, "XML_File", cluster_xml_file), "w") as cluster_xml:
+      cluster_xml.write("<cluster><platform_name>" + cluster_name + "</platform_name><datacenter>BENCH</datacenter>"
+        "<account><intersight_account>benchmark-account-" + str(cluster_number) + "</intersight_account>"
+        "<service_account_type>benchmark</service_account_type><cisco_account><email>benchmark@example.com</email></cisco_account>"
+        "<api_keys><key01><api_key_id>benchmark-key-" + str(cluster_number) + "</api_key_id></key01></api_keys></account></cluster>")
+    write_private_key(os.path.join(cluster_directory, "Intersight_Service_Account", "API_Keys", "key01", "SecretKey.txt"))
+    with open(os.path.join(sessions_directory, "session" + str(cluster_number).zfill(4) + ".xml"), "w") as session_xml:
+      session_xml.write("<session><id>" + str(900000 + cluster_number) + "</id><datacenter>BENCH</datacenter>"
+        "<devices><device><name>" + cluster_name + "</name></device></devices></session>")
+  return sessions_directory, clusters_directory
+
+
+def summarize_durations(durations):
+  """This is a function to summarize a list of durations in seconds as milliseconds.
+
+  Args:
+    durations: A list of durations in seconds.
+
+  Returns:
+    A dictionary containing the count, minimum, mean, median, 95th percentile and maximum durations.
+  """
+  sorted_durations = sorted(durations)
+  return {
+    "count": len(sorted_durations),
+    "min_ms": round(sorted_durations[0] * 1000, 3),
+    "mean_ms": round(statistics.mean(sorted_durations) * 1000, 3),
+    "median_ms": round(statistics.median(sorted_durations) * 1000, 3),
+    "p95_ms": round(sorted_durations[min(len(sorted_durations) - 1, int(len(sorted_durations) * 0.95))] * 1000, 3),
+    "max_ms": round(sorted_durations[-1] * 1000, 3)
+  }
+
+
+def measure_call_latency(api_client,iterations):
+  """This is a function to measure the latency of each Intersight Universal Function against the mock server.
+
+  Args:
+    api_client: The Intersight API client connected to the mock server.
+    iterations: The number of times each function is called.
+
+  Returns:
+    A dictionary of latency summaries keyed by function name.
+  """
+  api_path = "hyperflex/SysConfigPolicies"
+  durations = {"iu_post": [], "iu_get": [], "iu_get_paged": [], "iu_get_moid": [], "iu_patch_moid": [], "iu_delete_moid": []}
+
+  def timed(function_name, *args):
+    start_time = time.perf_counter()
+    result = function_name_map[function_name](*args)
+    durations[function_name].append(time.perf_counter() - start_time)
+    return result
+
+  function_name_map = {
+    "iu_post": hx_policy_maker.iu_post,
+    "iu_get": hx_policy_maker.iu_get,
+    "iu_get_paged": lambda *args: list(hx_policy_maker.iu_get_paged(*args)),
+    "iu_get_moid": hx_policy_maker.iu_get_moid,
+    "iu_patch_moid": hx_policy_maker.iu_patch_moid,
+    "iu_delete_moid": hx_policy_maker.iu_delete_moid
+  }
+  for iteration in range(iterations):
+    policy_name = "benchmark-sys-config-policy-" + str(iteration)
+    timed("iu_post", api_path, {"Name": policy_name, "Timezone": "America/New_York"}, api_client)
+    timed("iu_get", api_path, api_client)
+    matching_policies = timed("iu_get_paged", api_path, "Name eq '" + policy_name + "'", None, 100, None, api_client)
+    moid = matching_policies[0]["Moid"]
+    timed("iu_get_moid", api_path, moid, api_client)
+    timed("iu_patch_moid", api_path, moid, {"Timezone": "America/Chicago"}, api_client)
+    timed("iu_delete_moid", api_path, moid, api_client)
+  return {function_name: summarize_durations(function_durations) for function_name, function_durations in durations.items()}
+
+
+def measure_provisioning(mock_server,work_directory,cluster_count,max_workers,reconcile,bulk):
+  """This is a function to measure the end-to-end HyperFlex policy provisioning throughput of fleet mode.
+
+  Args:
+    mock_server: The running mock Intersight server. It is reset before the run, along with the availability test
+      cache and the range allocators, so that each measured run starts from the same state.
+    work_directory: The directory in which the benchmark files are written.
+    cluster_count: The number of clusters to be provisioned.
+    max_workers: The maximum number of sessions provisioned at the same time.
+    reconcile: If True, fleet mode is run in reconcile mode.
+    bulk: If True, fleet mode is run in bulk mode.
+
+  Returns:
+    A dictionary containing the elapsed time, the throughput, the number of completed sessions and the mock
+    server request counters.
+  """
+  sessions_directory, clusters_directory = write_benchmark_sessions(work_directory, cluster_count)
+  mock_server.reset()
+  hx_policy_maker.availability_cache.clear()
+  for allocator, parse_value, format_value in hx_policy_maker.range_allocators.values():
+    allocator.reset()
+  start_time = time.perf_counter()
+  fleet_results = hx_policy_maker.run_fleet([sessions_directory], max_workers, clusters_directory, reconcile, bulk)
+  elapsed_time = time.perf_counter() - start_time
+  return {
+    "clusters": cluster_count,
+    "elapsed_s": round(elapsed_time, 3),
+    "clusters_per_s": round(cluster_count / elapsed_time, 3),
+    "completed": [fleet_result["status"] for fleet_result in fleet_results].count("completed"),
+    "server_requests": mock_server.get_stats()
+  }
+
+
+def find_regressions(results,baseline,tolerance):
+  """This is a function to compare benchmark results with a baseline.
+
+  Args:
+    results: The benchmark results.
+    baseline: The baseline benchmark results.
+    tolerance: The allowed fraction of slowdown before a result is reported as a regression.
+
+  Returns:
+    A list of statements describing each regression.
+  """
+  regressions = []
+  for function_name, latency in results["call_latency"].items():
+    baseline_latency = baseline.get("call_latency", {}).get(function_name)
+    if baseline_latency and latency["median_ms"] > baseline_latency["median_ms"] * (1 + tolerance):
+      regressions.append(function_name + " median latency " + str(latency["median_ms"]) + " ms exceeds the baseline of " + str(baseline_latency["median_ms"]) + " ms.")
+  baseline_provisioning = {run["clusters"]: run for run in baseline.get("provisioning", [])}
+  for run in results["provisioning"]:
+    baseline_run = baseline_provisioning.get(run["clusters"])
+    if baseline_run and run["clusters_per_s"] < baseline_run["clusters_per_s"] * (1 - tolerance):
+      regressions.append(str(run["clusters"]) + " cluster throughput " + str(run["clusters_per_s"]) + " clusters/s is below the baseline of " + str(baseline_run["clusters_per_s"]) + " clusters/s.")
+  return regressions
+
+
+def main():
+  argument_parser = argparse.ArgumentParser(description="Benchmark the HyperFlex Edge Policy Maker against a local mock Intersight server.")
+  argument_parser.add_argument("--iterations", type=int, default=20, help="The number of calls of each Intersight Universal Function. The default value is 20.")
+  argument_parser.add_argument("--clusters", default="1,2,4,8", help="A comma-separated list of cluster counts to provision. The default value is 1,2,4,8.")
+  argument_parser.add_argument("--max-workers", type=int, default=8, help="The maximum number of sessions provisioned at the same time. The default value is 8.")
+  argument_parser.add_argument("--reconcile", action="store_true", help="Run fleet mode in reconcile mode.")
+  argument_parser.add_argument("--bulk", action="store_true", help="Run fleet mode in bulk mode.")
+  argument_parser.add_argument("--rate-limit", type=float, default=0, help="The client request rate limit in requests per second. The default value is 0 (no limit).")
+  argument_parser.add_argument("--latency", type=float, default=0.05, help="The mock server latency in seconds. The default value is 0.05.")
+  argument_parser.add_argument("--latency-jitter", type=float, default=0.0, help="The maximum random mock server latency in seconds.")
+  argument_parser.add_argument("--error-rate", type=float, default=0.0, help="The fraction of mock server requests that fail with a 503 error.")
+  argument_parser.add_argument("--throttle-rate", type=int, default=0, help="The mock server requests per second before 429 errors are returned.")
+  argument_parser.add_argument("--output", help="An optional path for the JSON benchmark results.")
+  argument_parser.add_argument("--baseline", help="An optional path to JSON benchmark results to check for regressions.")
+  argument_parser.add_argument("--tolerance", type=float, default=0.2, help="The allowed fraction of slowdown against the baseline. The default value is 0.2.")
+  script_arguments = argument_parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as work_directory:
+    logging.basicConfig(filename=os.path.join(work_directory, "benchmark.log"), level=logging.DEBUG, format="%(asctime)s %(message)s")
+
+    with MockIntersightServer(latency=script_arguments.latency, latency_jitter=script_arguments.latency_jitter, error_rate=script_arguments.error_rate, throttle_rate=script_arguments.throttle_rate) as mock_server:
+      hx_policy_maker.base_url = mock_server.url
+      hx_policy_maker.cluster_inventory_cache_file = os.path.join(work_directory, "cluster_inventory_cache.json")
+      hx_policy_maker.range_allocation_file = os.path.join(work_directory, "range_allocations.json")
+      hx_policy_maker.request_scheduler.rate = script_arguments.rate_limit
+
+      # Measure the per-call latency of the Intersight Universal Functions
+      sessions_directory, clusters_directory = write_benchmark_sessions(work_directory, 1)
+      session = hx_policy_maker.load_session(os.path.join(sessions_directory, "session0001.xml"), clusters_directory)
+      call_retries = hx_policy_maker.request_scheduler.get_stats()["retries"]
+      call_latency = measure_call_latency(hx_policy_maker.create_api_client(session), script_arguments.iterations)
+      call_retries = hx_policy_maker.request_scheduler.get_stats()["retries"] - call_retries
+
+      # Measure the end-to-end provisioning throughput for each cluster count
+      provisioning = []
+      for cluster_count in [int(cluster_count) for cluster_count in script_arguments.clusters.split(",")]:
+        provisioning.append(measure_provisioning(mock_server, work_directory, cluster_count, script_arguments.max_workers, script_arguments.reconcile, script_arguments.bulk))
+
+    results = {
+      "settings": {key: value for key, value in vars(script_arguments).items() if key not in ("output", "baseline")},
+      "call_latency": call_latency,
+      "call_retries": call_retries,
+      "provisioning": provisioning,
+      "request_scheduler": hx_policy_maker.request_scheduler.get_stats()
+    }
+    logging.shutdown()
+
+  print("Per-call latency (ms):")
+  print("  " + "function".ljust(16) + "".join(column.rjust(10) for column in ("median", "p95", "max")))
+  for function_name, latency in call_latency.items():
+    print("  " + function_name.ljust(16) + "".join(str(latency[column]).rjust(10) for column in ("median_ms", "p95_ms", "max_ms")))
+  if call_retries:
+    print("WARNING: " + str(call_retries) + " calls were retried while measuring the per-call latency, so the latencies include the retry backoff.")
+  print("End-to-end provisioning:")
+  for run in provisioning:
+    print("  " + str(run["clusters"]).rjust(5) + " clusters: " + str(run["elapsed_s"]) + " s, " + str(run["clusters_per_s"]) + " clusters/s, " + str(run["completed"]) + " completed")
+
+  if script_arguments.output:
+    with open(script_arguments.output, "w") as output_file:
+      json.dump(results, output_file, indent=2)
+
+  if script_arguments.baseline:
+    with open(script_arguments.baseline) as baseline_file:
+      regressions = find_regressions(results, json.load(baseline_file), script_arguments.tolerance)
+    for regression in regressions:
+      print("REGRESSION: " + regression)
+    if regressions:
+      sys.exit(1)
+  sys.exit(0)
+
+
+if __name__ == "__main__":
+  main()
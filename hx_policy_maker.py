@@ -9,60 +9,1166 @@ Notes: Tested on Intersight API Reference v1.0.9-1229
 # Import needed Python modules
 import sys
 import json
-import requests
+import argparse
+import bisect
+import collections
+import copy
+import concurrent.futures
+import glob
+import functools
+import socket
+import types
+import ipaddress
+import contextlib
+import threading
+import time
+import random
 import os
 import logging
 import datetime
+import queue
 import xml.etree.ElementTree as et
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.utils import formatdate
-import intersight
-from intersight.intersight_api_client import IntersightApiClient
-
-# Define time variable
-get_date = datetime.datetime.now()
-date = get_date.strftime("%m/%d/%Y %H:%M:%S")
-
-# Setup Logging
-logging.basicConfig(filename="c:\\dcloud\\intersight_hx_policy_creator.log", level=logging.DEBUG, format="%(asctime)s %(message)s")
-logging.info("Starting the Intersight Policy Set Creator for HyperFlex Edge Script.")
-
-# Parse dCloud session.xml file to determine assigned HyperFlex Edge cluster and assign to variable
-session_xml = et.parse("c:\\dcloud\\session.xml")
-
-# Create needed variables from session.xml file
-cluster_name = session_xml.find("devices/device/name").text
-datacenter_name = session_xml.find("datacenter").text
-
-# Parse matching cluster.xml file based on assigned HyperFlex Edge cluster
-if cluster_name == "HyperFlex HXAF220c M5 Cluster 01":
-  cluster_xml = et.parse("c:\\Scripts\\Clusters\\" + datacenter_name + "\\HyperFlex HXAF220c M5 Cluster 01\\XML_File\\cluster01.xml")
-if cluster_name == "HyperFlex HXAF220c M5 Cluster 02":
-  cluster_xml = et.parse("c:\\Scripts\\Clusters\\" + datacenter_name + "\\HyperFlex HXAF220c M5 Cluster 02\\XML_File\\cluster02.xml")
-if cluster_name == "HyperFlex HXAF220c M5 Cluster 03":
-  cluster_xml = et.parse("c:\\Scripts\\Clusters\\" + datacenter_name + "\\HyperFlex HXAF220c M5 Cluster 03\\XML_File\\cluster03.xml")
-
-# Create needed variables from cluster.xml file
-intersight_account_name = cluster_xml.find("account/intersight_account").text
-intersight_account_email = cluster_xml.find("account/cisco_account/email").text
-intersight_account_cluster = cluster_xml.find("platform_name").text
-intersight_account_service_type = cluster_xml.find("account/service_account_type").text
-intersight_account_session = session_xml.find("id").text
-intersight_account_location = cluster_xml.find("datacenter").text
+
+# The Intersight SDK for Python, urllib3 and the email modules are imported by the functions that need them, so
+# that importing this script is fast and free of side effects.
+
+# Define the log file location
+log_file = "c:\\dcloud\\intersight_hx_policy_creator.log"
+
+# Define dCloud session and cluster file locations
+dcloud_session_xml = "c:\\dcloud\\session.xml"
+dcloud_clusters_directory = "c:\\Scripts\\Clusters"
+
+# Define the cluster inventory cache file and the cluster.xml elements stored in the cluster inventory
+cluster_inventory_cache_file = "c:\\dcloud\\cluster_inventory_cache.json"
+cluster_inventory_elements = {
+  "account/intersight_account": "intersight_account_name",
+  "account/cisco_account/email": "intersight_account_email",
+  "platform_name": "intersight_account_cluster",
+  "account/service_account_type": "intersight_account_service_type",
+  "datacenter": "intersight_account_location",
+  "account/api_keys/key01/api_key_id": "key_id"
+}
+
+# The cluster inventories loaded in this process, keyed by clusters directory
+cluster_inventories = {}
+cluster_inventory_lock = threading.Lock()
 
 # Define Intersight SDK IntersightApiClient variables
 # Tested on Cisco Intersight API Reference v1.0.9-1229
-key_id = cluster_xml.find("account/api_keys/key01/api_key_id").text
-key = "C:\\Scripts\\Clusters\\" + datacenter_name + "\\" + cluster_name + "\\Intersight_Service_Account\\API_Keys\\key01\\SecretKey.txt"
 base_url = "https://intersight.com/api/v1"
-api_instance = IntersightApiClient(host=base_url,private_key=key,api_key_id=key_id)
+
+# The Intersight API client used by the Intersight Universal Functions when no client is provided
+api_instance = None
+
+# Define the Intersight API connection pool settings. Each Intersight API client keeps up to
+# connection_pool_maxsize HTTPS connections alive for reuse, so the pool size should be at least
+# policy_creation_max_workers. The timeouts are in seconds.
+connection_pool_maxsize = 16
+connection_pool_block = False
+connection_keep_alive = True
+connection_timeout = 10
+read_timeout = 60
+# The request scheduler retries failed Intersight API calls, so urllib3 does not retry them on its own by default
+connection_retries = 0
+
+# Define the maximum number of parsed Intersight API private keys kept for request signing
+signing_key_cache_size = 64
+
+# Define the Intersight API request scheduler settings, shared by all Intersight API calls in the process.
+# The request rate is in requests per second per Intersight account (0 for no limit) and the backoff times are in
+# seconds.
+request_rate_limit = 10
+request_burst_size = 20
+request_max_retries = 5
+request_backoff_base = 0.5
+request_backoff_max = 30
+retryable_status_codes = (429, 500, 502, 503, 504)
+# POST requests are not idempotent, so they are only retried when Intersight did not process the request
+post_retryable_status_codes = (429, 503)
+
+# Define the Intersight API response cache settings for iu_get and iu_get_moid. The cache size is the maximum
+# number of cached responses (0 disables the cache), the maximum total size is in bytes and the TTL is the number of
+# seconds a cached response is used before it is revalidated. An optional cache file keeps the responses across runs.
+response_cache_size = 0
+response_cache_max_bytes = 16777216
+response_cache_ttl = 30
+response_cache_file = None
+
+# Define the Intersight API and Account Availability Test settings. A passed test is reused for the cache window in
+# seconds. The circuit breaker opens after the failure threshold of consecutive Intersight API outage failures, then
+# fails the tests of every dCloud session without contacting Intersight until the reset timeout in seconds has passed.
+availability_cache_window = 300
+circuit_breaker_failure_threshold = 3
+circuit_breaker_reset_timeout = 60
+# The availability test request is retried fewer times than other requests, so that each failed test is quick and
+# counts towards the circuit breaker threshold
+availability_test_max_retries = 0
+
+# Define the run journal settings. Each Intersight API write operation is recorded in the run journal file, which is
+# synced to disk after the batch size number of records or the interval in seconds, so an interrupted run can be
+# resumed.
+run_journal_file = "c:\\dcloud\\hx_policy_maker_journal.jsonl"
+run_journal_fsync_batch_size = 32
+run_journal_fsync_interval = 1.0
+
+# Define the maximum number of HyperFlex policy POST requests that can be sent to Intersight at the same time
+policy_creation_max_workers = 6
+
+# Define the teardown settings, with the name prefix of the HyperFlex policies to be deleted and the maximum number
+# of DELETE requests that can be sent to Intersight at the same time
+teardown_name_prefix = "sample-"
+teardown_max_workers = 8
+
+# Define the Intersight bulk request settings, with the maximum number of operations allowed per bulk request
+bulk_request_uri_prefix = "/v1/"
+bulk_request_max_size = 100
+
+# Define the IP address and MAC address prefix pools, from which each HyperFlex Edge cluster is allocated a range of
+# management IP addresses and a range of HyperFlex Data Platform IP addresses (one per node) and a MAC address
+# prefix. The allocations are kept in the range allocation file.
+range_allocation_file = "c:\\dcloud\\range_allocations.json"
+ip_address_pool = ("198.18.135.101", "198.18.191.254")
+mac_prefix_pool = ("00:25:B5:00", "00:25:B5:FF")
+cluster_node_count = 2
+
+# Define the maximum number of dCloud sessions that can be provisioned at the same time in fleet mode
+fleet_max_workers = 8
+
+# Define the upper bounds in seconds of the latency histogram buckets for API calls and pipeline phases
+metrics_histogram_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# The in-memory latency histograms and the logger for structured JSON metric records
+metrics_lock = threading.Lock()
+metrics_histograms = {}
+metrics_logger = logging.getLogger("hx_policy_maker.metrics")
+
+
+# Establish metrics functions
+
+def record_metric(metric_type,labels,duration,status=None,request_bytes=0,response_bytes=0):
+  """This is a function to record the duration, status and payload size of an Intersight API call or pipeline
+  phase. The measurement is added to the in-memory latency histogram and emitted as a structured JSON log record.
+
+  Args:
+    metric_type: The type of the measurement, either "call" or "phase".
+    labels: A dictionary of labels identifying the measurement. For example, {"method": "POST",
+      "api_type": "hyperflex/SysConfigPolicies"} or {"phase": "availability_test"}.
+    duration: The duration of the measurement in seconds.
+    status: The HTTP status code of the API call or the outcome of the phase.
+    request_bytes: The size of the request body in bytes.
+    response_bytes: The size of the response body in bytes.
+  """
+  histogram_key = (metric_type, tuple(sorted(labels.items())))
+  with metrics_lock:
+    histogram = metrics_histograms.get(histogram_key)
+    if histogram is None:
+      histogram = {"count": 0, "sum": 0.0, "max": 0.0, "buckets": [0] * len(metrics_histogram_buckets), "statuses": {}, "request_bytes": 0, "response_bytes": 0}
+      metrics_histograms[histogram_key] = histogram
+    histogram["count"] += 1
+    histogram["sum"] += duration
+    histogram["max"] = max(histogram["max"], duration)
+    for bucket_index, bucket_upper_bound in enumerate(metrics_histogram_buckets):
+      if duration <= bucket_upper_bound:
+        histogram["buckets"][bucket_index] += 1
+        break
+    histogram["statuses"][str(status)] = histogram["statuses"].get(str(status), 0) + 1
+    histogram["request_bytes"] += request_bytes
+    histogram["response_bytes"] += response_bytes
+  metrics_logger.info(json.dumps(dict(labels, type=metric_type, duration_ms=round(duration * 1000, 3), status=status, request_bytes=request_bytes, response_bytes=response_bytes)))
+
+
+@contextlib.contextmanager
+def timed_phase(phase,**labels):
+  """This is a context manager to record the duration and outcome of a pipeline phase, such as the XML parsing,
+  client initialization, availability test or policy creation. The outcome is "ok" unless the phase raises an
+  exception or the caller sets the "status" key of the yielded dictionary.
+
+  Args:
+    phase: The name of the pipeline phase.
+    **labels: Additional labels identifying the phase.
+
+  Yields:
+    A dictionary in which the phase status can be set.
+  """
+  phase_record = {"status": "ok"}
+  start_time = time.perf_counter()
+  try:
+    yield phase_record
+  except BaseException:
+    phase_record["status"] = "error"
+    raise
+  finally:
+    record_metric("phase", dict(labels, phase=phase), time.perf_counter() - start_time, phase_record["status"])
+
+
+def reset_metrics():
+  """This is a function to clear the recorded latency histograms, so that each run reports only its own metrics."""
+  with metrics_lock:
+    metrics_histograms.clear()
+
+
+def get_metrics_summary():
+  """This is a function to summarize the recorded latency histograms.
+
+  Returns:
+    A dictionary containing a list of summaries for API calls and pipeline phases, and the request scheduler
+    statistics.
+  """
+  metrics_summary = {"call": [], "phase": [], "request_scheduler": request_scheduler.get_stats()}
+  with metrics_lock:
+    for (metric_type, labels), histogram in sorted(metrics_histograms.items()):
+      metrics_summary[metric_type].append(dict(labels,
+        count=histogram["count"],
+        avg_ms=round(histogram["sum"] / histogram["count"] * 1000, 3),
+        max_ms=round(histogram["max"] * 1000, 3),
+        buckets=dict(zip([str(bucket_upper_bound) for bucket_upper_bound in metrics_histogram_buckets] + ["+Inf"], histogram["buckets"] + [histogram["count"] - sum(histogram["buckets"])])),
+        statuses=dict(histogram["statuses"]),
+        request_bytes=histogram["request_bytes"],
+        response_bytes=histogram["response_bytes"]))
+  return metrics_summary
+
+
+def format_prometheus_labels(labels):
+  """This is a function to format a sequence of label name and value pairs as Prometheus labels.
+
+  Args:
+    labels: A sequence of tuples, each containing a label name and value.
+
+  Returns:
+    A string containing the comma-separated Prometheus labels, without the enclosing braces.
+  """
+  return ",".join(label_name + "=\"" + str(label_value).replace("\\", "\\\\").replace("\"", "\\\"") + "\"" for label_name, label_value in labels)
+
+
+def format_prometheus_metrics():
+  """This is a function to format the recorded latency histograms in the Prometheus text exposition format, for use
+  with the node exporter textfile collector.
+
+  Returns:
+    A string containing the Prometheus metrics.
+  """
+  metric_lines = []
+  with metrics_lock:
+    for metric_type in ("call", "phase"):
+      metric_name = "hx_policy_maker_" + metric_type + "_duration_seconds"
+      metric_lines.append("# HELP " + metric_name + " Duration of Intersight API " + ("calls" if metric_type == "call" else "pipeline phases") + " in seconds.")
+      metric_lines.append("# TYPE " + metric_name + " histogram")
+      for (histogram_type, labels), histogram in sorted(metrics_histograms.items()):
+        if histogram_type != metric_type:
+          continue
+        label_text = format_prometheus_labels(labels)
+        cumulative_count = 0
+        for bucket_upper_bound, bucket_count in zip(metrics_histogram_buckets, histogram["buckets"]):
+          cumulative_count += bucket_count
+          metric_lines.append(metric_name + "_bucket{" + label_text + ",le=\"" + str(bucket_upper_bound) + "\"} " + str(cumulative_count))
+        metric_lines.append(metric_name + "_bucket{" + label_text + ",le=\"+Inf\"} " + str(histogram["count"]))
+        metric_lines.append(metric_name + "_sum{" + label_text + "} " + repr(histogram["sum"]))
+        metric_lines.append(metric_name + "_count{" + label_text + "} " + str(histogram["count"]))
+    metric_lines.append("# HELP hx_policy_maker_call_payload_bytes_total Size of Intersight API request and response bodies in bytes.")
+    metric_lines.append("# TYPE hx_policy_maker_call_payload_bytes_total counter")
+    for (histogram_type, labels), histogram in sorted(metrics_histograms.items()):
+      if histogram_type != "call":
+        continue
+      label_text = format_prometheus_labels(labels)
+      metric_lines.append("hx_policy_maker_call_payload_bytes_total{" + label_text + ",direction=\"request\"} " + str(histogram["request_bytes"]))
+      metric_lines.append("hx_policy_maker_call_payload_bytes_total{" + label_text + ",direction=\"response\"} " + str(histogram["response_bytes"]))
+  return "\n".join(metric_lines) + "\n"
+
+
+def write_metrics_summary(metrics_file):
+  """This is a function to write the recorded metrics at the end of a run. The file is written in the Prometheus
+  text exposition format if its name ends with ".prom", otherwise a JSON summary is written. The file is replaced
+  atomically, so that a metrics collector never reads a partial file.
+
+  Args:
+    metrics_file: The path of the metrics file to be written.
+  """
+  if metrics_file.endswith(".prom"):
+    metrics_content = format_prometheus_metrics()
+  else:
+    metrics_content = json.dumps(get_metrics_summary(), indent=2)
+  temporary_metrics_file = metrics_file + ".tmp"
+  with open(temporary_metrics_file, "w") as metrics_output:
+    metrics_output.write(metrics_content)
+  os.replace(temporary_metrics_file, metrics_file)
+  logging.info("The run metrics have been written to '" + metrics_file + "'.")
+
+
+# Establish dCloud session functions
+
+def parse_cluster_xml(cluster_xml_path):
+  """This is a function to incrementally parse the cluster inventory details from a cluster.xml file. Parsing stops
+  as soon as all of the cluster_inventory_elements have been found.
+
+  Args:
+    cluster_xml_path: The path to the cluster.xml file.
+
+  Returns:
+    A dictionary containing the cluster inventory details. Elements that are not found are set to None.
+  """
+  cluster_details = dict.fromkeys(cluster_inventory_elements.values())
+  remaining_elements = set(cluster_inventory_elements)
+  element_path = []
+  for event, element in et.iterparse(cluster_xml_path, events=("start", "end")):
+    if event == "start":
+      element_path.append(element.tag)
+      continue
+    current_path = "/".join(element_path[1:])
+    if current_path in remaining_elements:
+      cluster_details[cluster_inventory_elements[current_path]] = element.text
+      remaining_elements.discard(current_path)
+      if not remaining_elements:
+        break
+    element_path.pop()
+    element.clear()
+  return cluster_details
+
+
+def scan_cluster_directory(cluster_directory,cached_cluster=None):
+  """This is a function to read the cluster inventory details of a cluster directory. The cluster.xml file is only
+  parsed if its path, modification time or size differs from the provided cached cluster inventory details.
+
+  Args:
+    cluster_directory: The path to the cluster directory, containing the XML_File directory.
+    cached_cluster: The optional cached cluster inventory details of the cluster directory.
+
+  Returns:
+    A tuple containing the cluster inventory details, or None if the cluster directory has no readable cluster.xml
+    file, and a boolean value of True if the cluster.xml file was parsed.
+  """
+  cluster_xml_directory = os.path.join(cluster_directory, "XML_File")
+  try:
+    cluster_xml_files = sorted(file_name for file_name in os.listdir(cluster_xml_directory) if file_name.lower().endswith(".xml"))
+    if not cluster_xml_files:
+      return None, False
+    cluster_xml_path = os.path.join(cluster_xml_directory, cluster_xml_files[0])
+    cluster_xml_stat = os.stat(cluster_xml_path)
+  except OSError:
+    return None, False
+  if cached_cluster and cached_cluster["cluster_xml_path"] == cluster_xml_path and cached_cluster["mtime_ns"] == cluster_xml_stat.st_mtime_ns and cached_cluster["size"] == cluster_xml_stat.st_size:
+    return cached_cluster, False
+  try:
+    cluster_details = parse_cluster_xml(cluster_xml_path)
+  except et.ParseError as exception_message:
+    logging.info("Unable to parse the cluster file '" + cluster_xml_path + "'.")
+    logging.info(exception_message)
+    return None, False
+  return dict(cluster_details, cluster_xml_path=cluster_xml_path, mtime_ns=cluster_xml_stat.st_mtime_ns, size=cluster_xml_stat.st_size), True
+
+
+def scan_cluster_inventory(clusters_directory,cached_clusters):
+  """This is a function to scan the clusters directory and build the cluster inventory. Each cluster.xml file is
+  only parsed if it is not in the provided cached cluster inventory, or if its modification time or size has
+  changed.
+
+  Args:
+    clusters_directory: The path to the directory containing the cluster.xml files of each datacenter, organized
+      as <datacenter>\\<cluster name>\\XML_File\\<cluster.xml file>.
+    cached_clusters: A dictionary of previously scanned cluster inventory details, keyed by
+      "<datacenter>/<cluster name>".
+
+  Returns:
+    A tuple containing the dictionary of cluster inventory details keyed by "<datacenter>/<cluster name>" and the
+    number of cluster.xml files that were parsed.
+  """
+  scanned_clusters = {}
+  parsed_count = 0
+  datacenter_entries = [entry for entry in os.scandir(clusters_directory) if entry.is_dir()] if os.path.isdir(clusters_directory) else []
+  for datacenter_entry in datacenter_entries:
+    for cluster_entry in os.scandir(datacenter_entry.path):
+      if not cluster_entry.is_dir():
+        continue
+      inventory_key = datacenter_entry.name + "/" + cluster_entry.name
+      cluster_details, parsed = scan_cluster_directory(cluster_entry.path, cached_clusters.get(inventory_key))
+      if cluster_details is not None:
+        scanned_clusters[inventory_key] = cluster_details
+        parsed_count += parsed
+  return scanned_clusters, parsed_count
+
+
+def read_cluster_inventory_cache():
+  """Returns the cached cluster inventories of every clusters directory from the cluster inventory cache file."""
+  try:
+    with open(cluster_inventory_cache_file) as cache_input:
+      return json.load(cache_input)
+  except (OSError, ValueError):
+    return {}
+
+
+def write_cluster_inventory_cache(clusters_directory,cluster_inventory):
+  """Saves the cluster inventory of a clusters directory to the cluster inventory cache file."""
+  cached_inventories = read_cluster_inventory_cache()
+  cached_inventories[clusters_directory] = cluster_inventory
+  temporary_cache_file = cluster_inventory_cache_file + "." + str(os.getpid()) + ".tmp"
+  try:
+    with open(temporary_cache_file, "w") as cache_output:
+      json.dump(cached_inventories, cache_output)
+    os.replace(temporary_cache_file, cluster_inventory_cache_file)
+  except OSError as exception_message:
+    logging.info("Unable to write the cluster inventory cache file '" + cluster_inventory_cache_file + "'.")
+    logging.info(exception_message)
+
+
+def load_cluster_inventory(clusters_directory=dcloud_clusters_directory,refresh=False):
+  """This is a function to load the cluster inventory of a clusters directory. The inventory is loaded once per
+  process and kept in memory. It is read from the cluster inventory cache file if the clusters directory has been
+  scanned before, otherwise the clusters directory is scanned and the cache file is updated.
+
+  Args:
+    clusters_directory: The path to the directory containing the cluster.xml files of each datacenter. The default
+      value is "c:\\Scripts\\Clusters".
+    refresh: If True, the clusters directory is scanned again for added or modified cluster.xml files, even if the
+      inventory has already been loaded. The default value is False.
+
+  Returns:
+    A dictionary of cluster inventory details keyed by "<datacenter>/<cluster name>".
+  """
+  with cluster_inventory_lock:
+    if clusters_directory in cluster_inventories and not refresh:
+      return cluster_inventories[clusters_directory]
+    with timed_phase("inventory_load"):
+      cached_inventories = read_cluster_inventory_cache()
+      if clusters_directory in cached_inventories and not refresh:
+        cluster_inventories[clusters_directory] = cached_inventories[clusters_directory]
+        logging.info("The cluster inventory of '" + clusters_directory + "' has been loaded from the cluster inventory cache file with " + str(len(cluster_inventories[clusters_directory])) + " clusters.")
+        return cluster_inventories[clusters_directory]
+
+      # Scan the clusters directory, parsing only the added or modified cluster.xml files
+      cached_clusters = cluster_inventories.get(clusters_directory) or cached_inventories.get(clusters_directory, {})
+      scanned_clusters, parsed_count = scan_cluster_inventory(clusters_directory, cached_clusters)
+      cluster_inventories[clusters_directory] = scanned_clusters
+      logging.info("The cluster inventory of '" + clusters_directory + "' has been loaded with " + str(len(scanned_clusters)) + " clusters (" + str(parsed_count) + " cluster files parsed).")
+      if scanned_clusters != cached_inventories.get(clusters_directory):
+        write_cluster_inventory_cache(clusters_directory, scanned_clusters)
+    return scanned_clusters
+
+
+def find_cluster(clusters_directory,datacenter_name,cluster_name):
+  """This is a function to look up a cluster in the cluster inventory. Only the cluster.xml file of the cluster is
+  checked for changes, and the clusters directory is only scanned again if the cluster is not in the inventory or
+  its cluster.xml file can no longer be read.
+
+  Args:
+    clusters_directory: The path to the directory containing the cluster.xml files of each datacenter.
+    datacenter_name: The name of the datacenter of the cluster.
+    cluster_name: The name of the cluster.
+
+  Returns:
+    A dictionary containing the cluster inventory details.
+
+  Raises:
+    KeyError: The cluster is not in the clusters directory.
+  """
+  inventory_key = datacenter_name + "/" + cluster_name
+  cluster_inventory = load_cluster_inventory(clusters_directory)
+  cached_cluster = cluster_inventory.get(inventory_key)
+  if cached_cluster is not None:
+    try:
+      cluster_xml_stat = os.stat(cached_cluster["cluster_xml_path"])
+      if cached_cluster["mtime_ns"] == cluster_xml_stat.st_mtime_ns and cached_cluster["size"] == cluster_xml_stat.st_size:
+        return cached_cluster
+    except OSError:
+      pass
+
+    # Read the changed cluster directory again
+    cluster_details, parsed = scan_cluster_directory(os.path.join(clusters_directory, datacenter_name, cluster_name), cached_cluster)
+    if cluster_details is not None:
+      with cluster_inventory_lock:
+        cluster_inventory[inventory_key] = cluster_details
+        write_cluster_inventory_cache(clusters_directory, cluster_inventory)
+      return cluster_details
+
+  # Scan the clusters directory again for a new cluster
+  return load_cluster_inventory(clusters_directory, refresh=True)[inventory_key]
+
+
+def load_session(session_xml_path=dcloud_session_xml,clusters_directory=dcloud_clusters_directory):
+  """This is a function to load the details of a dCloud session and the assigned HyperFlex Edge cluster and
+  Intersight service account. The cluster details are looked up in the cluster inventory. An argument for the
+  session.xml file path is optional.
+
+  Args:
+    session_xml_path: The path to the dCloud session.xml file. The default value is "c:\\dcloud\\session.xml".
+    clusters_directory: The path to the directory containing the cluster.xml files and Intersight API keys of
+      each datacenter. The default value is "c:\\Scripts\\Clusters".
+
+  Returns:
+    A dictionary containing the session, cluster and Intersight service account details.
+
+  Raises:
+    KeyError: The cluster assigned to the dCloud session is not in the cluster inventory.
+  """
+  with timed_phase("xml_parse"):
+    # Parse dCloud session.xml file to determine assigned HyperFlex Edge cluster
+    session_xml = et.parse(session_xml_path)
+    cluster_name = session_xml.find("devices/device/name").text
+    datacenter_name = session_xml.find("datacenter").text
+
+  # Look up the assigned HyperFlex Edge cluster in the cluster inventory
+  cluster_details = find_cluster(clusters_directory, datacenter_name, cluster_name)
+  cluster_directory = os.path.join(clusters_directory, datacenter_name, cluster_name)
+
+  session = {
+    "session_xml_path": session_xml_path,
+    "cluster_xml_path": cluster_details["cluster_xml_path"],
+    "cluster_name": cluster_name,
+    "datacenter_name": datacenter_name,
+    "intersight_account_session": session_xml.find("id").text,
+    "key": os.path.join(cluster_directory, "Intersight_Service_Account", "API_Keys", "key01", "SecretKey.txt")
+  }
+  for field_name in cluster_inventory_elements.values():
+    session[field_name] = cluster_details[field_name]
+  return session
+
+
+def enable_signing_key_cache():
+  """This is a function to cache the private keys parsed by the Intersight SDK for Python when signing requests.
+  Without the cache, the SecretKey.txt private key is parsed again for every signed request. The cache is shared
+  by all Intersight API clients in the process and is keyed by the private key contents. If the Intersight SDK
+  does not sign requests with the RSA module, the signing is left unchanged.
+  """
+  from intersight.intersight_api_client import IntersightApiClient
+  sdk_module = sys.modules.get(IntersightApiClient.__module__)
+  rsa_module = getattr(sdk_module, "RSA", None)
+  if rsa_module is None or getattr(rsa_module, "signing_key_cache_enabled", False):
+    return
+  cached_import_key = functools.lru_cache(maxsize=signing_key_cache_size)(rsa_module.importKey)
+  cached_rsa_module = types.ModuleType(rsa_module.__name__)
+  cached_rsa_module.__dict__.update(rsa_module.__dict__)
+  cached_rsa_module.importKey = cached_import_key
+  cached_rsa_module.import_key = cached_import_key
+  cached_rsa_module.signing_key_cache_enabled = True
+  sdk_module.RSA = cached_rsa_module
+  logging.info("The Intersight API private key cache for request signing has been enabled.")
+
+
+class TimedSigner(object):
+  """A wrapper of a request signer of the Intersight SDK for Python that records the duration of each signature as
+  a "request_signing" phase, so that the signing time can be told apart from the rest of each API call.
+  """
+
+  def __init__(self,signer):
+    self.signer = signer
+
+  def sign(self,message_hash):
+    with timed_phase("request_signing"):
+      return self.signer.sign(message_hash)
+
+  def __getattr__(self,name):
+    return getattr(self.signer, name)
+
+
+def enable_signing_metrics():
+  """This is a function to time the request signing of the Intersight SDK for Python as its own pipeline phase.
+  Request signing is performed inside the call_api method of the Intersight API client, so its duration is also
+  included in the duration of each API call. If the Intersight SDK does not sign requests with the PKCS1_v1_5
+  module, the signing is not timed.
+  """
+  from intersight.intersight_api_client import IntersightApiClient
+  sdk_module = sys.modules.get(IntersightApiClient.__module__)
+  signature_module = getattr(sdk_module, "PKCS1_v1_5", None)
+  if signature_module is None or getattr(signature_module, "signing_metrics_enabled", False):
+    return
+  timed_signature_module = types.ModuleType(signature_module.__name__)
+  timed_signature_module.__dict__.update(signature_module.__dict__)
+  timed_signature_module.new = lambda *args, **kwargs: TimedSigner(signature_module.new(*args, **kwargs))
+  timed_signature_module.signing_metrics_enabled = True
+  sdk_module.PKCS1_v1_5 = timed_signature_module
+
+
+def configure_connection_pool(api_client):
+  """This is a function to apply the connection pool settings to the HTTPS transport of an Intersight API client,
+  so that connections are kept alive and reused instead of performing a TLS handshake for every API call.
+
+  Args:
+    api_client: The Intersight API client to be configured.
+  """
+  pool_manager = getattr(getattr(api_client, "rest_client", None), "pool_manager", None)
+  if pool_manager is None:
+    logging.info("The Intersight API client does not expose a connection pool. The default connection settings will be used.")
+    return
+  import urllib3
+  socket_options = list(urllib3.connection.HTTPConnection.default_socket_options)
+  if connection_keep_alive:
+    socket_options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+  pool_manager.connection_pool_kw.update(
+    maxsize=connection_pool_maxsize,
+    block=connection_pool_block,
+    timeout=urllib3.Timeout(connect=connection_timeout, read=read_timeout),
+    socket_options=socket_options,
+    retries=urllib3.Retry(connection_retries)
+  )
+  pool_manager.clear()
+
+
+def create_api_client(session):
+  """This is a function to create an Intersight API client for the Intersight service account of a dCloud session.
+  The client is configured with the connection pool settings and the shared private key cache for request signing.
+
+  Args:
+    session: A dictionary of dCloud session details, as returned by the load_session function.
+
+  Returns:
+    An IntersightApiClient object for the Intersight service account.
+  """
+  with timed_phase("client_init"):
+    from intersight.intersight_api_client import IntersightApiClient
+    enable_signing_key_cache()
+    enable_signing_metrics()
+    api_client = IntersightApiClient(host=base_url,private_key=session["key"],api_key_id=session["key_id"])
+    configure_connection_pool(api_client)
+  return api_client
+
+
+# Establish Intersight API request scheduler
+
+class RequestScheduler(object):
+  """A request scheduler that paces Intersight API calls with token bucket rate limiters and retries calls that
+  fail with a retryable status code or connection error, using jittered exponential backoff. Each bucket key, such
+  as an Intersight account, has its own token bucket. A Retry-After header from Intersight overrides the backoff,
+  and a throttled (429) response pauses all calls sharing the bucket key.
+
+  Attributes:
+    rate: The number of requests per second allowed on average for each bucket key. A value of 0 disables the rate
+      limit.
+    burst: The number of requests that can be sent at once for each bucket key before the rate limit applies.
+    max_retries: The maximum number of retries for each call.
+    backoff_base: The backoff time in seconds before the first retry, doubled for each later retry.
+    backoff_max: The maximum backoff time in seconds.
+    stats: A dictionary of call, attempt, retry, throttled response, failure and wait time counters.
+  """
+
+  def __init__(self,rate,burst,max_retries,backoff_base,backoff_max):
+    self.rate = rate
+    self.burst = burst
+    self.max_retries = max_retries
+    self.backoff_base = backoff_base
+    self.backoff_max = backoff_max
+    self.buckets = {}
+    self.lock = threading.Lock()
+    self.stats = {"calls": 0, "attempts": 0, "retries": 0, "throttled": 0, "failures": 0, "wait_seconds": 0.0}
+
+  def get_bucket(self,bucket_key):
+    """Returns the token bucket of a bucket key, creating a full bucket for a new key. The lock must be held."""
+    bucket = self.buckets.get(bucket_key)
+    if bucket is None:
+      bucket = self.buckets[bucket_key] = {"tokens": float(self.burst), "updated": time.monotonic(), "paused_until": 0.0}
+    return bucket
+
+  def acquire(self,bucket_key=None):
+    """Waits until a request can be sent under the rate limit and any throttling pause of the bucket key."""
+    while True:
+      with self.lock:
+        bucket = self.get_bucket(bucket_key)
+        now = time.monotonic()
+        if self.rate > 0:
+          bucket["tokens"] = min(float(self.burst), bucket["tokens"] + (now - bucket["updated"]) * self.rate)
+        bucket["updated"] = now
+        if now >= bucket["paused_until"] and (self.rate <= 0 or bucket["tokens"] >= 1):
+          if self.rate > 0:
+            bucket["tokens"] -= 1
+          return
+        wait_time = bucket["paused_until"] - now
+        if self.rate > 0:
+          wait_time = max(wait_time, (1 - bucket["tokens"]) / self.rate)
+        self.stats["wait_seconds"] += wait_time
+      time.sleep(wait_time)
+
+  def retry_delay(self,attempt,exception):
+    """Returns the number of seconds to wait before retrying a failed call."""
+    backoff = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+    retry_after = None
+    headers = getattr(exception, "headers", None)
+    if headers:
+      retry_after = headers.get("Retry-After")
+    if not retry_after:
+      return backoff
+    try:
+      retry_after_seconds = float(retry_after)
+    except ValueError:
+      from email.utils import parsedate_to_datetime
+      try:
+        retry_after_seconds = (parsedate_to_datetime(retry_after) - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+      except (TypeError, ValueError):
+        return backoff
+    return min(self.backoff_max, max(0.0, retry_after_seconds))
+
+  def is_retryable(self,method,exception):
+    """Returns True if a call that failed with the provided exception can be retried."""
+    import urllib3
+    status = getattr(exception, "status", None)
+    if method == "POST":
+      # A connection error is wrapped in a MaxRetryError once the retries of urllib3 are used up
+      connection_errors = (urllib3.exceptions.NewConnectionError, urllib3.exceptions.ConnectTimeoutError)
+      return status in post_retryable_status_codes or isinstance(exception, connection_errors) or isinstance(getattr(exception, "reason", None), connection_errors)
+    return status in retryable_status_codes or isinstance(exception, urllib3.exceptions.HTTPError)
+
+  def call(self,method,function,*args,max_retries=None,bucket_key=None,**kwargs):
+    """Calls the provided function under the rate limit, retrying it if it fails with a retryable error.
+
+    Args:
+      method: The HTTP method of the call, used to determine which failures can be retried.
+      function: The function performing the call.
+      *args: The positional arguments for the function.
+      max_retries: The maximum number of retries for this call. The default value is the max_retries attribute.
+      bucket_key: The key of the token bucket pacing this call, such as the Intersight account of the call. Calls
+        without a bucket key share one token bucket.
+      **kwargs: The keyword arguments for the function.
+
+    Returns:
+      The value returned by the function.
+
+    Raises:
+      Exception: The call failed with an error that cannot be retried, or all retries have failed. The exception
+      raised by the last attempt is re-raised.
+    """
+    if max_retries is None:
+      max_retries = self.max_retries
+    with self.lock:
+      self.stats["calls"] += 1
+    attempt = 0
+    while True:
+      self.acquire(bucket_key)
+      with self.lock:
+        self.stats["attempts"] += 1
+      try:
+        return function(*args, **kwargs)
+      except Exception as exception:
+        if attempt >= max_retries or not self.is_retryable(method, exception):
+          # A 304 response to a conditional request is not a failure
+          if getattr(exception, "status", None) != 304:
+            with self.lock:
+              self.stats["failures"] += 1
+          raise
+        delay = self.retry_delay(attempt, exception)
+        status = getattr(exception, "status", None)
+        with self.lock:
+          self.stats["retries"] += 1
+          if status == 429:
+            self.stats["throttled"] += 1
+            bucket = self.get_bucket(bucket_key)
+            bucket["paused_until"] = max(bucket["paused_until"], time.monotonic() + delay)
+        logging.info("Retrying the " + method + " request after a " + str(status or type(exception).__name__) + " error in " + str(round(delay, 2)) + " seconds.")
+        if status != 429:
+          time.sleep(delay)
+        attempt += 1
+
+  def get_stats(self):
+    """Returns a copy of the request statistics."""
+    with self.lock:
+      return dict(self.stats)
+
+
+# The request scheduler shared by all Intersight API clients
+request_scheduler = RequestScheduler(request_rate_limit,request_burst_size,request_max_retries,request_backoff_base,request_backoff_max)
+
+
+def iu_call_api(api_client,resource_path,method,max_retries=None,**call_api_kwargs):
+  """This is a function to perform an Intersight API call through the shared request scheduler, so that the call
+  is paced by the rate limit of its Intersight account and retried if Intersight throttles the request or is
+  temporarily unavailable.
+
+  Args:
+    api_client: The Intersight API client used to perform the API call.
+    resource_path: The full resource path of the API call. For example, "/hyperflex/SysConfigPolicies".
+    method: The HTTP method of the API call.
+    max_retries: The maximum number of retries for the API call. The default value is set by the
+      request_max_retries variable.
+    **call_api_kwargs: Additional keyword arguments for the call_api method of the Intersight API client.
+
+  Returns:
+    The value returned by the call_api method of the Intersight API client.
+  """
+  request_bytes = len(json.dumps(call_api_kwargs["body"])) if call_api_kwargs.get("body") is not None else 0
+  status = None
+  response_bytes = 0
+  start_time = time.perf_counter()
+  try:
+    response = request_scheduler.call(method, api_client.call_api, resource_path, method, max_retries=max_retries, bucket_key=get_cache_namespace(api_client), **call_api_kwargs)
+    if isinstance(response, tuple):
+      status = response[1]
+      response_headers = response[2] or {}
+    else:
+      status = getattr(response, "status", None)
+      response_headers = response.getheaders() if hasattr(response, "getheaders") else {}
+    response_bytes = int(response_headers.get("Content-Length") or 0)
+    return response
+  except Exception as exception:
+    status = getattr(exception, "status", None) or type(exception).__name__
+    raise
+  finally:
+    api_type = "/".join(resource_path.strip("/").split("/")[:2])
+    record_metric("call", {"method": method, "api_type": api_type}, time.perf_counter() - start_time, status, request_bytes, response_bytes)
+
+
+# Establish Intersight API response cache
+
+def get_cache_namespace(api_client):
+  """This is a function to determine the response cache namespace of an Intersight API client, so that the cached
+  responses of different Intersight accounts are kept apart.
+
+  Args:
+    api_client: The Intersight API client.
+
+  Returns:
+    A string containing the API key ID and host of the Intersight API client.
+  """
+  api_key_id = getattr(api_client, "api_key_id", None) or "client-" + str(id(api_client))
+  return str(api_key_id) + "@" + str(getattr(api_client, "host", base_url))
+
+
+class ResponseCache(object):
+  """A least recently used cache of Intersight API GET responses, limited by entry count and total size. Cached
+  responses are used as they are until the TTL expires, then revalidated with an ETag conditional request, or by
+  comparing the ModTime values of the cached objects with a $select=ModTime query if no ETag was returned.
+
+  Attributes:
+    max_entries: The maximum number of cached responses. A value of 0 disables the cache.
+    max_bytes: The maximum total size in bytes of the cached responses.
+    ttl: The number of seconds a cached response is used before it is revalidated.
+    stats: A dictionary of hit, revalidation, miss, eviction and invalidation counters.
+  """
+
+  def __init__(self,max_entries,max_bytes,ttl):
+    self.max_entries = max_entries
+    self.max_bytes = max_bytes
+    self.ttl = ttl
+    self.entries = collections.OrderedDict()
+    self.total_bytes = 0
+    self.lock = threading.Lock()
+    self.stats = {"hits": 0, "revalidated": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+  def get(self,cache_key):
+    """Returns the cached entry for the provided cache key and marks it as recently used, or None if not cached."""
+    with self.lock:
+      entry = self.entries.get(cache_key)
+      if entry is not None:
+        self.entries.move_to_end(cache_key)
+      return entry
+
+  def store(self,cache_key,data,etag=None):
+    """Caches a response body and its ETag, evicting the least recently used responses if needed."""
+    with self.lock:
+      self.stats["misses"] += 1
+      self.remove(cache_key)
+      if self.max_entries <= 0 or len(data) > self.max_bytes:
+        return
+      self.entries[cache_key] = {"data": data, "etag": etag, "validated": time.time()}
+      self.total_bytes += len(data)
+      while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+        evicted_key, evicted_entry = self.entries.popitem(last=False)
+        self.total_bytes -= len(evicted_entry["data"])
+        self.stats["evictions"] += 1
+
+  def mark_validated(self,cache_key,revalidated=False):
+    """Counts a cache hit and restarts the TTL of the cached entry if it has been revalidated."""
+    with self.lock:
+      if revalidated:
+        self.stats["revalidated"] += 1
+        if cache_key in self.entries:
+          self.entries[cache_key]["validated"] = time.time()
+      else:
+        self.stats["hits"] += 1
+
+  def remove(self,cache_key):
+    entry = self.entries.pop(cache_key, None)
+    if entry is not None:
+      self.total_bytes -= len(entry["data"])
+    return entry
+
+  def invalidate(self,api_client,api_path,moid=None):
+    """Removes the cached responses affected by a write to an object or collection of an Intersight API type.
+
+    Args:
+      api_client: The Intersight API client used to perform the write.
+      api_path: The path to the targeted Intersight API type.
+      moid: The managed object ID of the targeted API object, if any.
+    """
+    namespace = get_cache_namespace(api_client)
+    cache_keys = [namespace + " /" + api_path]
+    if moid:
+      cache_keys.append(namespace + " /" + api_path + "/" + moid)
+    with self.lock:
+      for cache_key in cache_keys:
+        if self.remove(cache_key) is not None:
+          self.stats["invalidations"] += 1
+
+  def load(self,cache_file):
+    """Loads the cached responses saved by a previous run from the provided cache file, if it exists."""
+    try:
+      with open(cache_file) as cache_input:
+        saved_entries = json.load(cache_input)
+    except (OSError, ValueError):
+      return
+    with self.lock:
+      for cache_key, saved_entry in saved_entries.items():
+        self.remove(cache_key)
+        self.entries[cache_key] = {"data": saved_entry["data"].encode("utf-8"), "etag": saved_entry.get("etag"), "validated": saved_entry.get("validated", 0)}
+        self.total_bytes += len(self.entries[cache_key]["data"])
+      while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes):
+        evicted_key, evicted_entry = self.entries.popitem(last=False)
+        self.total_bytes -= len(evicted_entry["data"])
+
+  def save(self,cache_file):
+    """Saves the cached responses to the provided cache file, so that they can be reused by a later run."""
+    with self.lock:
+      saved_entries = {cache_key: {"data": entry["data"].decode("utf-8"), "etag": entry["etag"], "validated": entry["validated"]} for cache_key, entry in self.entries.items()}
+    temporary_cache_file = cache_file + "." + str(os.getpid()) + ".tmp"
+    try:
+      with open(temporary_cache_file, "w") as cache_output:
+        json.dump(saved_entries, cache_output)
+      os.replace(temporary_cache_file, cache_file)
+    except OSError as exception_message:
+      logging.info("Unable to write the response cache file '" + cache_file + "'.")
+      logging.info(exception_message)
+
+  def get_stats(self):
+    """Returns a copy of the cache statistics, with the current number of entries and total size."""
+    with self.lock:
+      return dict(self.stats, entries=len(self.entries), bytes=self.total_bytes)
+
+
+# The response cache shared by all Intersight API clients
+response_cache = ResponseCache(response_cache_size,response_cache_max_bytes,response_cache_ttl)
+
+
+def mod_times_match(api_client,api_path,moid,cached_results):
+  """This is a function to check whether the objects of a cached response are unchanged, by comparing their ModTime
+  values with those returned by a $select=ModTime query, which is much smaller than the full response.
+
+  Args:
+    api_client: The Intersight API client used to perform the API call.
+    api_path: The path to the targeted Intersight API type.
+    moid: The managed object ID of the targeted API object, or None if the cached response is a collection.
+    cached_results: The parsed cached response.
+
+  Returns:
+    A boolean value of True if the same objects are returned with the same ModTime values, otherwise False.
+  """
+  cached_objects = [cached_results] if moid else cached_results.get("Results") or []
+  cached_mod_times = sorted((cached_object.get("Moid") or "", cached_object.get("ModTime") or "") for cached_object in cached_objects)
+  if not all(mod_time for object_moid, mod_time in cached_mod_times):
+    return False
+  query_params = [("$select", "ModTime")]
+  if moid:
+    query_params.append(("$filter", "Moid eq '" + moid + "'"))
+  response = iu_call_api(api_client,"/" + api_path,"GET",query_params=query_params,_return_http_data_only=True,_preload_content=False)
+  current_objects = json.loads(response.data).get("Results") or []
+  response.release_conn()
+  return sorted((current_object.get("Moid") or "", current_object.get("ModTime") or "") for current_object in current_objects) == cached_mod_times
+
+
+def iu_get_cached(api_client,api_path,moid=None):
+  """This is a function to perform a GET of an Intersight API type or object through the response cache. If the
+  cache is disabled, the full response is always downloaded.
+
+  Args:
+    api_client: The Intersight API client used to perform the API calls.
+    api_path: The path to the targeted Intersight API type.
+    moid: The managed object ID of the targeted API object. The default value is None, which targets all objects
+      of the API type.
+
+  Returns:
+    The parsed response.
+
+  Raises:
+    Exception: An exception occured while performing the API call.
+  """
+  full_resource_path = "/" + api_path + ("/" + moid if moid else "")
+  cache_key = get_cache_namespace(api_client) + " " + full_resource_path
+  entry = response_cache.get(cache_key) if response_cache.max_entries > 0 else None
+  header_params = {}
+  if entry is not None:
+    if time.time() - entry["validated"] < response_cache.ttl:
+      response_cache.mark_validated(cache_key)
+      return json.loads(entry["data"])
+    if entry["etag"]:
+      header_params["If-None-Match"] = entry["etag"]
+    elif mod_times_match(api_client, api_path, moid, json.loads(entry["data"])):
+      response_cache.mark_validated(cache_key, revalidated=True)
+      return json.loads(entry["data"])
+  try:
+    response = iu_call_api(api_client,full_resource_path,"GET",header_params=header_params,_return_http_data_only=True,_preload_content=False)
+  except Exception as exception:
+    if entry is not None and getattr(exception, "status", None) == 304:
+      response_cache.mark_validated(cache_key, revalidated=True)
+      return json.loads(entry["data"])
+    raise
+  data = response.data
+  etag = response.getheaders().get("ETag")
+  response.release_conn()
+  results = json.loads(data)
+  if response_cache.max_entries > 0:
+    response_cache.store(cache_key, data if isinstance(data, bytes) else data.encode("utf-8"), etag)
+  return results
+
+
+# Establish run journal
+
+class RunJournal(object):
+  """An append-only journal of the planned and completed Intersight API write operations of a run, kept as JSON
+  lines so that a run interrupted by a crash can be resumed. Each record is flushed to the journal file when it is
+  written, and the journal file is synced to disk in batches. Objects are identified by the Intersight account, the
+  API type path and the object name.
+
+  Attributes:
+    fsync_batch_size: The number of records after which the journal file is synced to disk.
+    fsync_interval: The number of seconds after which the journal file is synced to disk when a record is written.
+    completed_operations: A dictionary of the last successful operation record of each object, keyed by a tuple of
+      the account, API type path and object name.
+    in_doubt_operations: A set of the planned operations that have not been recorded as successful, keyed in the
+      same way. An interrupted run may have completed them without recording it.
+    stats: A dictionary of record, replayed record and sync counters.
+  """
+
+  def __init__(self,fsync_batch_size,fsync_interval):
+    self.fsync_batch_size = fsync_batch_size
+    self.fsync_interval = fsync_interval
+    self.journal_file = None
+    self.unsynced_records = 0
+    self.last_sync = time.monotonic()
+    self.completed_operations = {}
+    self.in_doubt_operations = set()
+    self.object_names = {}
+    self.lock = threading.Lock()
+    self.stats = {"records": 0, "replayed": 0, "syncs": 0}
+
+  def open(self,journal_path,resume=False):
+    """Opens the journal file. If resume is True, the records of the interrupted run are replayed and new records
+    are appended, otherwise the journal file is started over."""
+    with self.lock:
+      self.completed_operations = {}
+      self.in_doubt_operations = set()
+      self.object_names = {}
+      if resume:
+        self.replay(journal_path)
+      self.journal_file = open(journal_path, "a" if resume else "w")
+
+  def replay(self,journal_path):
+    """Replays the records of the journal file, then truncates the journal file after the last complete record so
+    that a record cut short by the crash is not joined with the first record appended by the resumed run."""
+    try:
+      with open(journal_path, "rb+") as journal_input:
+        complete_offset = 0
+        for journal_line in journal_input:
+          if not journal_line.endswith(b"\n"):
+            # The last record may have been cut short by the crash
+            break
+          complete_offset += len(journal_line)
+          try:
+            record = json.loads(journal_line)
+          except ValueError:
+            continue
+          self.apply(record)
+          self.stats["replayed"] += 1
+        journal_input.truncate(complete_offset)
+    except OSError:
+      pass
+
+  def apply(self,record):
+    """Updates the completed operations with a completed operation record, filling in the object name from an
+    earlier record of the same object if needed, and the in doubt operations with a planned operation record."""
+    if record.get("event") == "planned" and record.get("name"):
+      self.in_doubt_operations.add((record.get("account"), record.get("api_path"), record["name"]))
+    if record.get("event") != "completed":
+      return
+    object_key = (record.get("account"), record.get("moid"))
+    if not record.get("name") and record.get("moid"):
+      record["name"] = self.object_names.get(object_key, (None, None))[1]
+    if record.get("name") and record.get("moid"):
+      self.object_names[object_key] = (record["api_path"], record["name"])
+    if not record.get("name"):
+      return
+    operation_key = (record.get("account"), record["api_path"], record["name"])
+    status = record.get("status")
+    if record.get("method") != "DELETE" and (status == "unchanged" or (isinstance(status, int) and 200 <= status <= 299)):
+      self.completed_operations[operation_key] = record
+      self.in_doubt_operations.discard(operation_key)
+    else:
+      self.completed_operations.pop(operation_key, None)
+
+  def record(self,event,**record_fields):
+    """Writes a record to the journal, if the journal file is open."""
+    with self.lock:
+      if self.journal_file is None:
+        return
+      record = dict(record_fields, event=event, time=round(time.time(), 3))
+      self.apply(record)
+      self.journal_file.write(json.dumps(record) + "\n")
+      self.journal_file.flush()
+      self.stats["records"] += 1
+      self.unsynced_records += 1
+      if self.unsynced_records >= self.fsync_batch_size or time.monotonic() - self.last_sync >= self.fsync_interval:
+        self.sync()
+
+  def sync(self):
+    if self.unsynced_records:
+      os.fsync(self.journal_file.fileno())
+      self.stats["syncs"] += 1
+    self.unsynced_records = 0
+    self.last_sync = time.monotonic()
+
+  def is_completed(self,account,api_path,name):
+    """Returns True if the journal records a successful operation on the object that has not been deleted since."""
+    with self.lock:
+      return (account, api_path, name) in self.completed_operations
+
+  def is_in_doubt(self,account,api_path,name):
+    """Returns True if the journal records a planned operation on the object that was not recorded as successful,
+    so the object may or may not exist."""
+    with self.lock:
+      return (account, api_path, name) in self.in_doubt_operations
+
+  def close(self):
+    """Syncs and closes the journal file."""
+    with self.lock:
+      if self.journal_file is not None:
+        self.sync()
+        self.journal_file.close()
+        self.journal_file = None
+
+  def get_stats(self):
+    """Returns a copy of the journal statistics."""
+    with self.lock:
+      return dict(self.stats)
+
+
+# The run journal shared by every dCloud session of the script, which records nothing until it is opened
+run_journal = RunJournal(run_journal_fsync_batch_size,run_journal_fsync_interval)
+
+
+def journal_write_operation(api_client,method,api_path,moid,body,response):
+  """This is a function to record a completed Intersight API write operation in the run journal. The MOID and name
+  of the object are taken from the response body if needed.
+
+  Args:
+    api_client: The Intersight API client used to perform the API call.
+    method: The HTTP method of the API call.
+    api_path: The path to the targeted Intersight API type.
+    moid: The managed object ID of the targeted API object, or None for a POST of a new object.
+    body: The body configuration data of the API call, or None.
+    response: The raw response of the API call, or the exception raised by the API call.
+  """
+  response_body = {}
+  if isinstance(response, Exception):
+    status = getattr(response, "status", None) or type(response).__name__
+  else:
+    status = response.status
+    # The response body is always read, so that the connection is released to the pool with nothing left unread
+    response_data = response.data
+    response.release_conn()
+    if run_journal.journal_file is not None and method != "DELETE":
+      try:
+        response_body = json.loads(response_data) or {}
+      except (TypeError, ValueError):
+        pass
+  run_journal.record("completed", account=get_cache_namespace(api_client), method=method, api_path=api_path, name=(body or {}).get("Name") or response_body.get("Name"), moid=moid or response_body.get("Moid"), status=status)
 
 
 # Establish Intersight Universal Functions
 
-def iu_get(api_path):
+def iu_get(api_path,api_client=None):
   """This is a function to perform a universal or generic GET on objects under available Intersight API types,
   including those not yet defined in the Intersight SDK for Python. An argument for the API type path is required.
 
@@ -70,23 +1176,86 @@ def iu_get(api_path):
     api_path: The path to the targeted Intersight API type. For example, to specify the Intersight API type for
       adapter configuration policies, enter "adapter/ConfigPolicies". More API types can be found in the Intersight
       API reference library at https://intersight.com/apidocs/introduction/overview/.
+    api_client: The Intersight API client used to perform the API call. The default value is the api_instance
+      client.
 
   Returns:
     A dictionary containing all objects of the specified API type. If the API type is inaccessible, an
     implicit value of None will be returned.
   """
-  full_resource_path = "/" + api_path
+  if api_client is None:
+    api_client = api_instance
   try:
-    api_instance.call_api(full_resource_path,"GET")
-    response = api_instance.last_response.data
-    results = json.loads(response)
+    results = iu_get_cached(api_client,api_path)
     logging.info("The API resource path '" + api_path + "' has been accessed successfully.")
     return results
   except:
     logging.info("Unable to access the API resource path '" + api_path + "'.")
 
 
-def iu_get_moid(api_path,moid):
+def iu_get_paged(api_path,query_filter=None,select=None,page_size=100,max_results=None,api_client=None,raise_errors=False):
+  """This is a function to perform a universal or generic GET on objects under available Intersight API types
+  one page at a time, including those not yet defined in the Intersight SDK for Python. The objects are yielded
+  one at a time, so only one page of results is held in memory and the remaining pages are not downloaded if the
+  caller stops early. The pages are ordered by MOID, so that no object is skipped or repeated across pages. An
+  argument for the API type path is required.
+
+  Args:
+    api_path: The path to the targeted Intersight API type. For example, to specify the Intersight API type for
+      adapter configuration policies, enter "adapter/ConfigPolicies". More API types can be found in the Intersight
+      API reference library at https://intersight.com/apidocs/introduction/overview/.
+    query_filter: An optional server-side $filter query to limit the objects returned. For example,
+      "Name eq 'sample-sys-config-policy'".
+    select: An optional list of object properties to be returned by the server-side $select query. For example,
+      ["Name", "Moid"]. All object properties are returned by default.
+    page_size: The number of objects requested per page with the $top query. The default value is 100.
+    max_results: The optional maximum number of objects to be yielded. All matching objects are yielded by default.
+    api_client: The Intersight API client used to perform the API calls. The default value is the api_instance
+      client.
+    raise_errors: If True, an error accessing the API type is raised after it is logged, so that the caller can
+      tell an inaccessible API type from one without matching objects. The default value is False.
+
+  Yields:
+    A dictionary for each object of the specified API type. If the API type is inaccessible, no further objects
+    will be yielded.
+  """
+  if api_client is None:
+    api_client = api_instance
+  full_resource_path = "/" + api_path
+  query_params = []
+  if query_filter:
+    query_params.append(("$filter", query_filter))
+  if select:
+    query_params.append(("$select", ",".join(select)))
+  # Intersight does not guarantee a stable order without $orderby, which $top and $skip paging relies on
+  query_params.append(("$orderby", "Moid"))
+  skip = 0
+  yielded_count = 0
+  while True:
+    page_query_params = query_params + [("$top", page_size), ("$skip", skip)]
+    try:
+      response = iu_call_api(api_client,full_resource_path,"GET",query_params=page_query_params,_return_http_data_only=True,_preload_content=False)
+      page = json.loads(response.data)
+      response.release_conn()
+    except Exception as exception_message:
+      logging.info("Unable to access the API resource path '" + api_path + "'.")
+      logging.info(exception_message)
+      if raise_errors:
+        raise
+      return
+    page_results = page.get("Results") or []
+    logging.info("The API resource path '" + api_path + "' has been accessed successfully for " + str(len(page_results)) + " objects starting at object " + str(skip) + ".")
+    for result in page_results:
+      yield result
+      yielded_count += 1
+      if max_results is not None and yielded_count >= max_results:
+        return
+    if len(page_results) < page_size:
+      return
+    skip += page_size
+
+
+def iu_get_moid(api_path,moid,api_client=None):
   """This is a function to perform a universal or generic GET on a specified object under available
   Intersight API types, including those not yet defined in the Intersight SDK for Python. An argument for the
   API type path and MOID (managed object identifier) is required.
@@ -96,23 +1265,25 @@ def iu_get_moid(api_path,moid):
       adapter configuration policies, enter "adapter/ConfigPolicies". More API types can be found in the Intersight
       API reference library at https://intersight.com/apidocs/introduction/overview/.
     moid: The managed object ID of the targeted API object.
+    api_client: The Intersight API client used to perform the API call. The default value is the api_instance
+      client.
 
   Returns:
     A dictionary containing all parameters of the specified API object. If the API object is inaccessible, an
     implicit value of None will be returned.
   """
+  if api_client is None:
+    api_client = api_instance
   full_resource_path = "/" + api_path + "/" + moid
   try:
-    api_instance.call_api(full_resource_path,"GET")
-    response = api_instance.last_response.data
-    results = json.loads(response)
+    results = iu_get_cached(api_client,api_path,moid)
     logging.info("The object located at the resource path '" + full_resource_path + "' has been accessed succesfully.")
     return results
   except:
     logging.info("Unable to access the object located at the resource path '" + full_resource_path + "'.")
 
 
-def iu_delete_moid(api_path,moid):
+def iu_delete_moid(api_path,moid,api_client=None):
   """This is a function to perform a universal or generic DELETE on a specified object under available
   Intersight API types, including those not yet defined in the Intersight SDK for Python. An argument for the
   API type path and MOID (managed object identifier) is required.
@@ -122,6 +1293,8 @@ def iu_delete_moid(api_path,moid):
       adapter configuration policies, enter "adapter/ConfigPolicies". More API types can be found in the Intersight
       API reference library at https://intersight.com/apidocs/introduction/overview/.
     moid: The managed object ID of the targeted API object.
+    api_client: The Intersight API client used to perform the API call. The default value is the api_instance
+      client.
 
   Returns:
     A statement indicating whether the DELETE method was successful or failed.
@@ -130,18 +1303,24 @@ def iu_delete_moid(api_path,moid):
     Exception: An exception occured while performing the API call. The exact error will be
     specified.
   """
+  if api_client is None:
+    api_client = api_instance
   full_resource_path = "/" + api_path + "/" + moid
   try:
-    api_instance.call_api(full_resource_path,"DELETE")
+    response = iu_call_api(api_client,full_resource_path,"DELETE",_return_http_data_only=True,_preload_content=False)
+    journal_write_operation(api_client,"DELETE",api_path,moid,None,response)
     logging.info("The deletion of the object located at the resource path '" + full_resource_path + "' has been completed.")
     return "The DELETE method was successful."
   except Exception as exception_message:
     logging.info("Unable to access the object located at the resource path '" + full_resource_path + "'.")
     logging.info(exception_message)
+    journal_write_operation(api_client,"DELETE",api_path,moid,None,exception_message)
     return "The DELETE method failed."
+  finally:
+    response_cache.invalidate(api_client,api_path,moid)
 
 
-def iu_post(api_path,body):
+def iu_post(api_path,body,api_client=None):
   """This is a function to perform a universal or generic POST of an object under available Intersight
   API types, including those not yet defined in the Intersight SDK for Python. An argument for the
   API type path and body configuration data is required.
@@ -151,6 +1330,8 @@ def iu_post(api_path,body):
       adapter configuration policies, enter "adapter/ConfigPolicies". More API types can be found in the Intersight
       API reference library at https://intersight.com/apidocs/introduction/overview/.
     body: The content to be created under the targeted API type. This should be provided in a dictionary format.
+    api_client: The Intersight API client used to perform the API call. The default value is the api_instance
+      client.
   
   Returns:
     A statement indicating whether the POST method was successful or failed.
@@ -159,18 +1340,24 @@ def iu_post(api_path,body):
     Exception: An exception occured while performing the API call. The exact error will be
     specified.
   """
+  if api_client is None:
+    api_client = api_instance
   full_resource_path = "/" + api_path
   try:
-    api_instance.call_api(full_resource_path,"POST",body=body)
+    response = iu_call_api(api_client,full_resource_path,"POST",body=body,_return_http_data_only=True,_preload_content=False)
+    journal_write_operation(api_client,"POST",api_path,None,body,response)
     logging.info("The creation of the object under the resource path '" + full_resource_path + "' has been completed.")
     return "The POST method was successful."
   except Exception as exception_message:
     logging.info("Unable to create the object under the resource path '" + full_resource_path + "'.")
     logging.info(exception_message)
+    journal_write_operation(api_client,"POST",api_path,None,body,exception_message)
     return "The POST method failed."
+  finally:
+    response_cache.invalidate(api_client,api_path)
 
 
-def iu_post_moid(api_path,moid,body):
+def iu_post_moid(api_path,moid,body,api_client=None):
   """This is a function to perform a universal or generic POST of a specified object under available Intersight
   API types, including those not yet defined in the Intersight SDK for Python. An argument for the
   API type path, MOID (managed object identifier), and body configuration data is required.
@@ -181,6 +1368,8 @@ def iu_post_moid(api_path,moid,body):
       API reference library at https://intersight.com/apidocs/introduction/overview/.
     moid: The managed object ID of the targeted API object.
     body: The content to be modified on the targeted API object. This should be provided in a dictionary format.
+    api_client: The Intersight API client used to perform the API call. The default value is the api_instance
+      client.
   
   Returns:
     A statement indicating whether the POST method was successful or failed.
@@ -189,18 +1378,24 @@ def iu_post_moid(api_path,moid,body):
     Exception: An exception occured while performing the API call. The exact error will be
     specified.
   """
+  if api_client is None:
+    api_client = api_instance
   full_resource_path = "/" + api_path + "/" + moid
   try:
-    api_instance.call_api(full_resource_path,"POST",body=body)
+    response = iu_call_api(api_client,full_resource_path,"POST",body=body,_return_http_data_only=True,_preload_content=False)
+    journal_write_operation(api_client,"POST",api_path,moid,body,response)
     logging.info("The update of the object located at the resource path '" + full_resource_path + "' has been completed.")
     return "The POST method was successful."
   except Exception as exception_message:
     logging.info("Unable to access the object located at the resource path '" + full_resource_path + "'.")
     logging.info(exception_message)
+    journal_write_operation(api_client,"POST",api_path,moid,body,exception_message)
     return "The POST method failed."
+  finally:
+    response_cache.invalidate(api_client,api_path,moid)
 
 
-def iu_patch_moid(api_path,moid,body):
+def iu_patch_moid(api_path,moid,body,api_client=None):
   """This is a function to perform a universal or generic PATCH of a specified object under available Intersight
   API types, including those not yet defined in the Intersight SDK for Python. An argument for the
   API type path, MOID (managed object identifier), and body configuration data is required.
@@ -211,6 +1406,8 @@ def iu_patch_moid(api_path,moid,body):
       API reference library at https://intersight.com/apidocs/introduction/overview/.
     moid: The managed object ID of the targeted API object.
     body: The content to be modified on the targeted API object. This should be provided in a dictionary format.
+    api_client: The Intersight API client used to perform the API call. The default value is the api_instance
+      client.
   
   Returns:
     A statement indicating whether the PATCH method was successful or failed.
@@ -219,44 +1416,350 @@ def iu_patch_moid(api_path,moid,body):
     Exception: An exception occured while performing the API call. The exact error will be
     specified.
   """
+  if api_client is None:
+    api_client = api_instance
   full_resource_path = "/" + api_path + "/" + moid
   try:
-    api_instance.call_api(full_resource_path,"PATCH",body=body)
+    response = iu_call_api(api_client,full_resource_path,"PATCH",body=body,_return_http_data_only=True,_preload_content=False)
+    journal_write_operation(api_client,"PATCH",api_path,moid,body,response)
     logging.info("The update of the object located at the resource path '" + full_resource_path + "' has been completed.")
     return "The PATCH method was successful."
   except Exception as exception_message:
     logging.info("Unable to access the object located at the resource path '" + full_resource_path + "'.")
     logging.info(exception_message)
+    journal_write_operation(api_client,"PATCH",api_path,moid,body,exception_message)
     return "The PATCH method failed."
+  finally:
+    response_cache.invalidate(api_client,api_path,moid)
+
+
+def iu_post_concurrent(post_requests,max_workers=policy_creation_max_workers,api_client=None):
+  """This is a function to perform multiple universal or generic POSTs of objects under available Intersight
+  API types at the same time. Each POST is performed by the iu_post function, so the logging of each request
+  is unchanged. Only use this function for objects that do not depend on each other.
+  
+  Args:
+    post_requests: A list of tuples, each containing the path to the targeted Intersight API type and the body
+      configuration data for the object to be created. For example, ("hyperflex/SysConfigPolicies", body).
+    max_workers: The maximum number of POST requests that can be in progress at the same time. The default value
+      is set by the policy_creation_max_workers variable.
+    api_client: The Intersight API client used to perform the API calls. The default value is the api_instance
+      client.
+  
+  Returns:
+    A list of statements indicating whether each POST method was successful or failed, in the same order as the
+    provided POST requests.
+  """
+  if not post_requests:
+    return []
+  worker_count = max(1, min(max_workers, len(post_requests)))
+  with concurrent.futures.ThreadPoolExecutor(max_workers=worker_count) as executor:
+    post_futures = [executor.submit(iu_post, api_path, body, api_client) for api_path, body in post_requests]
+    post_results = [post_future.result() for post_future in post_futures]
+  successful_post_count = post_results.count("The POST method was successful.")
+  logging.info(str(successful_post_count) + " of " + str(len(post_requests)) + " POST requests have been completed successfully.")
+  return post_results
+
+
+def body_matches_object(desired_value,existing_value):
+  """This is a function to check whether a desired body configuration value is already set on an existing
+  Intersight API object value. Only the properties provided in the desired value are compared, and properties
+  not returned by Intersight, such as passwords, are treated as matching.
+
+  Args:
+    desired_value: The desired body configuration value.
+    existing_value: The matching value of the existing Intersight API object.
+
+  Returns:
+    A boolean value of True if the desired value is already set, otherwise False.
+  """
+  if isinstance(desired_value, dict):
+    if not isinstance(existing_value, dict):
+      return False
+    return all(body_matches_object(value, existing_value[key]) for key, value in desired_value.items() if key in existing_value)
+  if isinstance(desired_value, list):
+    if not isinstance(existing_value, list) or len(desired_value) != len(existing_value):
+      return False
+    return all(body_matches_object(desired_item, existing_item) for desired_item, existing_item in zip(desired_value, existing_value))
+  return desired_value == existing_value
+
+
+def iu_reconcile(object_requests,max_workers=policy_creation_max_workers,api_client=None,bulk=False):
+  """This is a function to idempotently create or update multiple objects under available Intersight API types.
+  The existing objects of each API type are retrieved with one filtered GET on the object names, then only the
+  missing objects are created with the iu_post function and only the changed objects are updated with the
+  iu_patch_moid function. Objects are matched by the "Name" property of the body configuration data.
+
+  Args:
+    object_requests: A list of tuples, each containing the path to the targeted Intersight API type and the body
+      configuration data for the object. For example, ("hyperflex/SysConfigPolicies", body).
+    max_workers: The maximum number of API calls that can be in progress at the same time. The default value is
+      set by the policy_creation_max_workers variable.
+    api_client: The Intersight API client used to perform the API calls. The default value is the api_instance
+      client.
+    bulk: If True, the missing and changed objects are created and updated with a single Intersight bulk request.
+      The default value is False.
+
+  Returns:
+    A list of statements indicating whether each object was created, updated, unchanged or failed, in the same
+    order as the provided object requests. If the existing objects of an API type cannot be retrieved, none of the
+    objects of that API type are created or updated.
+  """
+  if not object_requests:
+    return []
+
+  # Group the requested object names by API type
+  requested_names = {}
+  for api_path, body in object_requests:
+    requested_names.setdefault(api_path, []).append(body["Name"])
+
+  def get_existing_objects(api_path):
+    quoted_names = ["'" + name.replace("'", "''") + "'" for name in requested_names[api_path]]
+    name_filter = "Name in (" + ",".join(quoted_names) + ")"
+    try:
+      return {existing_object["Name"]: existing_object for existing_object in iu_get_paged(api_path, query_filter=name_filter, api_client=api_client, raise_errors=True)}
+    except Exception:
+      return None
+
+  def plan_object(api_path, body):
+    if existing_objects[api_path] is None:
+      return "The lookup of the existing objects failed."
+    existing_object = existing_objects[api_path].get(body["Name"])
+    if existing_object is None:
+      return ("POST", api_path, None, body)
+    changed_body = {key: value for key, value in body.items() if key in existing_object and not body_matches_object(value, existing_object[key])}
+    if not changed_body:
+      logging.info("The object named '" + body["Name"] + "' under the resource path '/" + api_path + "' is unchanged.")
+      return "No changes were needed."
+    return ("PATCH", api_path, existing_object["Moid"], changed_body)
+
+  def run_planned_request(planned_request):
+    method, api_path, moid, body = planned_request
+    if method == "POST":
+      return iu_post(api_path, body, api_client)
+    return iu_patch_moid(api_path, moid, body, api_client)
+
+  worker_count = max(1, min(max_workers, len(object_requests)))
+  with concurrent.futures.ThreadPoolExecutor(max_workers=worker_count) as executor:
+    # Index the existing objects of each API type by name
+    existing_object_futures = {api_path: executor.submit(get_existing_objects, api_path) for api_path in requested_names}
+    existing_objects = {api_path: existing_object_future.result() for api_path, existing_object_future in existing_object_futures.items()}
+    planned_requests = [plan_object(api_path, body) for api_path, body in object_requests]
+    write_requests = [planned_request for planned_request in planned_requests if isinstance(planned_request, tuple)]
+
+    # Create the missing objects and update the changed objects
+    if bulk:
+      write_results = iu_bulk(write_requests, api_client)
+    else:
+      write_futures = [executor.submit(run_planned_request, write_request) for write_request in write_requests]
+      write_results = [write_future.result() for write_future in write_futures]
+  write_results = iter(write_results)
+  reconcile_results = [next(write_results) if isinstance(planned_request, tuple) else planned_request for planned_request in planned_requests]
+  for result_statement in ("The POST method was successful.", "The PATCH method was successful.", "No changes were needed.", "The lookup of the existing objects failed."):
+    logging.info(str(reconcile_results.count(result_statement)) + " of " + str(len(object_requests)) + " objects: " + result_statement)
+  return reconcile_results
+
+
+def iu_delete_matching(api_paths,query_filter,max_workers=teardown_max_workers,api_client=None,bulk=False):
+  """This is a function to delete every object matching a $filter query under multiple available Intersight API
+  types. The matching objects of each API type are found with one filtered GET, then deleted concurrently with the
+  iu_delete_moid function, or with Intersight bulk requests.
+
+  Args:
+    api_paths: A list of paths to the targeted Intersight API types. For example, ["hyperflex/SysConfigPolicies"].
+    query_filter: The server-side $filter query selecting the objects to be deleted. For example,
+      "startswith(Name,'sample-')".
+    max_workers: The maximum number of API calls that can be in progress at the same time. The default value is
+      set by the teardown_max_workers variable.
+    api_client: The Intersight API client used to perform the API calls. The default value is the api_instance
+      client.
+    bulk: If True, the matching objects are deleted with Intersight bulk requests. The default value is False.
+
+  Returns:
+    A list of dictionaries, one for each matching object, containing the API type path, name and MOID of the
+    object and a statement indicating whether the DELETE method was successful or failed. If the matching objects
+    of an API type cannot be retrieved, a dictionary with a name and MOID of None and a statement indicating that
+    the lookup failed is returned for that API type instead.
+  """
+  if api_client is None:
+    api_client = api_instance
+  if not api_paths:
+    return []
+
+  def get_matching_objects(api_path):
+    try:
+      return [(api_path, matching_object.get("Name"), matching_object["Moid"]) for matching_object in iu_get_paged(api_path, query_filter=query_filter, select=["Name"], api_client=api_client, raise_errors=True)]
+    except Exception:
+      failed_lookups.append({"api_path": api_path, "name": None, "moid": None, "result": "The lookup of the matching objects failed."})
+      return []
+
+  failed_lookups = []
+  worker_count = max(1, max_workers)
+  with concurrent.futures.ThreadPoolExecutor(max_workers=worker_count) as executor:
+    # Find the matching objects of each API type
+    matching_object_futures = [executor.submit(get_matching_objects, api_path) for api_path in api_paths]
+    matching_objects = [matching_object for matching_object_future in matching_object_futures for matching_object in matching_object_future.result()]
+
+    # Delete the matching objects
+    if bulk:
+      delete_results = iu_bulk([("DELETE", api_path, moid, None) for api_path, name, moid in matching_objects], api_client)
+    else:
+      delete_futures = [executor.submit(iu_delete_moid, api_path, moid, api_client) for api_path, name, moid in matching_objects]
+      delete_results = [delete_future.result() for delete_future in delete_futures]
+  logging.info(str(delete_results.count("The DELETE method was successful.")) + " of " + str(len(matching_objects)) + " matching objects have been deleted.")
+  if failed_lookups:
+    logging.info("The matching objects of " + str(len(failed_lookups)) + " of " + str(len(api_paths)) + " API types could not be looked up.")
+  return failed_lookups + [{"api_path": api_path, "name": name, "moid": moid, "result": delete_result} for (api_path, name, moid), delete_result in zip(matching_objects, delete_results)]
+
+
+def iu_bulk(sub_requests,api_client=None):
+  """This is a function to perform multiple universal or generic POST, PATCH or DELETE operations on objects under
+  available Intersight API types with the Intersight bulk request API. All operations are submitted in as few
+  signed HTTP requests as possible, up to the bulk_request_max_size number of operations per request. The result
+  of each operation is reported and logged in the same way as the iu_post, iu_patch_moid and iu_delete_moid
+  functions.
+
+  Args:
+    sub_requests: A list of tuples, each containing the method, the path to the targeted Intersight API type, the
+      MOID of the targeted API object (or None for a POST of a new object) and the body configuration data (or
+      None for a DELETE). For example, ("POST", "hyperflex/SysConfigPolicies", None, body).
+    api_client: The Intersight API client used to perform the API calls. The default value is the api_instance
+      client.
+
+  Returns:
+    A list of statements indicating whether each operation was successful or failed, in the same order as the
+    provided sub-requests.
+  """
+  if api_client is None:
+    api_client = api_instance
+  bulk_results = []
+  for chunk_start in range(0, len(sub_requests), bulk_request_max_size):
+    chunk = sub_requests[chunk_start:chunk_start + bulk_request_max_size]
+    bulk_body = {"Requests": []}
+    for method, api_path, moid, body in chunk:
+      sub_request_uri = bulk_request_uri_prefix + api_path
+      if moid:
+        sub_request_uri += "/" + moid
+      sub_request = {"ObjectType": "bulk.RestSubRequest", "Verb": method, "Uri": sub_request_uri}
+      if body is not None:
+        sub_request["Body"] = body
+      bulk_body["Requests"].append(sub_request)
+    try:
+      response = iu_call_api(api_client,"/bulk/Requests","POST",body=bulk_body,_return_http_data_only=True,_preload_content=False)
+      sub_results = json.loads(response.data).get("Results") or []
+      response.release_conn()
+      logging.info("The bulk request of " + str(len(chunk)) + " operations has been completed.")
+    except Exception as exception_message:
+      logging.info("Unable to complete the bulk request of " + str(len(chunk)) + " operations.")
+      logging.info(exception_message)
+      sub_results = []
+
+    # Map each sub-request result back to the targeted resource path
+    for sub_request_index, (method, api_path, moid, body) in enumerate(chunk):
+      full_resource_path = "/" + api_path
+      if moid:
+        full_resource_path += "/" + moid
+      response_cache.invalidate(api_client,api_path,moid)
+      sub_result = sub_results[sub_request_index] if sub_request_index < len(sub_results) else {}
+      sub_result_status = sub_result.get("Status") or 0
+      sub_result_body = sub_result.get("Body") if isinstance(sub_result.get("Body"), dict) else {}
+      run_journal.record("completed", account=get_cache_namespace(api_client), method=method, api_path=api_path, name=(body or {}).get("Name") or sub_result_body.get("Name"), moid=moid or sub_result_body.get("Moid"), status=sub_result_status or "failed")
+      if 200 <= sub_result_status <= 299:
+        if method == "POST" and not moid:
+          logging.info("The creation of the object under the resource path '" + full_resource_path + "' has been completed.")
+        elif method == "DELETE":
+          logging.info("The deletion of the object located at the resource path '" + full_resource_path + "' has been completed.")
+        else:
+          logging.info("The update of the object located at the resource path '" + full_resource_path + "' has been completed.")
+        bulk_results.append("The " + method + " method was successful.")
+      else:
+        if method == "POST" and not moid:
+          logging.info("Unable to create the object under the resource path '" + full_resource_path + "'.")
+        else:
+          logging.info("Unable to access the object located at the resource path '" + full_resource_path + "'.")
+        if sub_result:
+          logging.info("(" + str(sub_result_status) + ") " + json.dumps(sub_result.get("Body")))
+        bulk_results.append("The " + method + " method failed.")
+  return bulk_results
+
+
+def iu_post_bulk(post_requests,api_client=None):
+  """This is a function to perform multiple universal or generic POSTs of objects under available Intersight
+  API types in a single Intersight bulk request, instead of one signed HTTP request per object.
+
+  Args:
+    post_requests: A list of tuples, each containing the path to the targeted Intersight API type and the body
+      configuration data for the object to be created. For example, ("hyperflex/SysConfigPolicies", body).
+    api_client: The Intersight API client used to perform the API calls. The default value is the api_instance
+      client.
+
+  Returns:
+    A list of statements indicating whether each POST method was successful or failed, in the same order as the
+    provided POST requests.
+  """
+  post_results = iu_bulk([("POST", api_path, None, body) for api_path, body in post_requests], api_client)
+  successful_post_count = post_results.count("The POST method was successful.")
+  logging.info(str(successful_post_count) + " of " + str(len(post_requests)) + " POST requests have been completed successfully.")
+  return post_results
 
 
 # Establish email alert functions and needed parameters
-# Setup email alert sender and recipients
+# Setup email alert sender, recipients and SMTP server
 sender = "dCloud_DCV_Demos@dcloud.cisco.com"
-receivers = ("uemekauw@cisco.com")
+receivers = ("uemekauw@cisco.com",)
+smtp_server = "192.168.100.100"
+smtp_port = 25
+smtp_timeout = 30
 
-# Setup email attachment files
-session_xml_attachment = "c:\\dcloud\\session.xml"
-cluster_xml_attachment = cluster_xml
+# Define the alert queue settings. Alerts raised within the digest window are merged into one email, each
+# Intersight account is alerted at most once per suppression window, and the SMTP connection is closed after the
+# idle timeout
+alert_digest_window = 30
+alert_suppression_window = 3600
+alert_smtp_idle_timeout = 60
 
 
-def intersight_account_status_alert():
-  """
-  Function to alert for Intersight service account and API availability test errors
+def create_alert_message(alert_groups):
+  """This is a function to create the email alert for Intersight service account and API availability test errors.
+  The session.xml and cluster.xml files of the affected dCloud sessions are attached to the alert, with each file
+  read once.
+
+  Args:
+    alert_groups: A dictionary of affected Intersight service accounts, keyed by account name. Each value is a list
+      of tuples, each containing the time of the failed availability test and the dCloud session details.
+
+  Returns:
+    An email.mime.multipart.MIMEMultipart object containing the email alert.
   """
-  
+  from email.mime.multipart import MIMEMultipart
+  from email.mime.text import MIMEText
+  from email.mime.base import MIMEBase
+  from email import encoders
+  from email.utils import formatdate
+
   # Create Email
   msg = MIMEMultipart()
   msg["From"] = sender
   msg["To"] = ", ".join(receivers)
   msg["Date"] = formatdate(localtime=True)
-  msg["Subject"] = "[dCloud Demo Service Account Alert]: Intersight Service Account " + intersight_account_name + " is Unavailable"
+  if len(alert_groups) == 1:
+    msg["Subject"] = "[dCloud Demo Service Account Alert]: Intersight Service Account " + str(next(iter(alert_groups))) + " is Unavailable"
+  else:
+    msg["Subject"] = "[dCloud Demo Service Account Alert]: " + str(len(alert_groups)) + " Intersight Service Accounts are Unavailable"
 
-  # Email body content
-  message = """<html>
-  <body>
-  <b>BRIEF SUMMARY ON AFFECTED SERVICE ACCOUNT:</b>
-  <br>
+  # Email body content, with a brief summary for each affected service account
+  account_summaries = []
+  attachment_files = []
+  for intersight_account_name, account_alerts in alert_groups.items():
+    alert_time, session = account_alerts[0]
+    session_ids = []
+    for alert_time, alert_session in account_alerts:
+      if alert_session["intersight_account_session"] not in session_ids:
+        session_ids.append(alert_session["intersight_account_session"])
+      for xml in (alert_session["session_xml_path"], alert_session["cluster_xml_path"]):
+        if xml not in attachment_files:
+          attachment_files.append(xml)
+    account_summaries.append("""
   Service Account Type: %(intersight_account_service_type)s
   <br>
   Name: %(intersight_account_name)s
@@ -269,10 +1772,29 @@ def intersight_account_status_alert():
   <br>
   Location: %(intersight_account_location)s
   <br>
+  Failed Availability Tests: %(alert_count)s, from %(first_date)s to %(last_date)s
+  <br>
+  """ % dict(
+      intersight_account_name=intersight_account_name,
+      intersight_account_service_type=session["intersight_account_service_type"],
+      intersight_account_email=session["intersight_account_email"],
+      intersight_account_cluster=session["intersight_account_cluster"],
+      intersight_account_session=", ".join(str(session_id) for session_id in session_ids),
+      intersight_account_location=session["intersight_account_location"],
+      alert_count=len(account_alerts),
+      first_date=datetime.datetime.fromtimestamp(account_alerts[0][0]).strftime("%m/%d/%Y %H:%M:%S"),
+      last_date=datetime.datetime.fromtimestamp(account_alerts[-1][0]).strftime("%m/%d/%Y %H:%M:%S")
+      ))
+
+  message = """<html>
+  <body>
+  <b>BRIEF SUMMARY ON AFFECTED SERVICE ACCOUNTS:</b>
+  <br>
+  %(account_summaries)s
   Generated from Automation Script: intersight_hx_policy_creator.py
   <br><br>
 
-  <b>ISSUE:</b> Please be advised that on %(date)s, the Intersight service account named %(intersight_account_name)s did not pass the availability test for session ID #%(intersight_account_session)s located in %(intersight_account_location)s. Please directly check the Intersight service account at https://intersight.com to verify the account status and that all permitted users are present. See the attached session.xml and cluster.xml files for additional details on the demo session and Intersight service account.
+  <b>ISSUE:</b> Please be advised that the Intersight service accounts summarized above did not pass the availability test for the listed session IDs and locations. Please directly check the Intersight service accounts at https://intersight.com to verify the account status and that all permitted users are present. See the attached session.xml and cluster.xml files for additional details on the demo sessions and Intersight service accounts.
   <br><br>
 
   <b>RESOLUTION:</b> Verify that the HyperFlex Edge cluster was actually assigned to the demo session, as the Intersight service account will not be assigned without a matching cluster. If the service account type, name, email, cluster and location in the above summary are blank, than likely an oversubscription of resources has occured on the dCloud platform. Other causes may be that an Intersight cloud service is down. Visit https://status.intersight.com to check the status of Intersight cloud services.
@@ -280,74 +1802,291 @@ def intersight_account_status_alert():
   </html>
 
   <br><br>
-  """ % dict(
-    intersight_account_name=intersight_account_name,
-    intersight_account_service_type=intersight_account_service_type,
-    intersight_account_email=intersight_account_email,
-    intersight_account_cluster=intersight_account_cluster,
-    intersight_account_session=intersight_account_session,
-    intersight_account_location=intersight_account_location,
-    date=date
-    )
+  """ % dict(account_summaries="<br>".join(account_summaries))
 
   msg.attach(MIMEText(message, "html"))
 
-  files = [session_xml_attachment, cluster_xml_attachment]
+  for xml in attachment_files:
+    try:
+      with open(xml, "rb") as attachment:
+        part = MIMEBase("application", "octet-stream")
+        part.set_payload(attachment.read())
+    except (OSError, TypeError):
+      logging.info("Unable to attach the file '" + str(xml) + "' to the email alert.")
+      continue
+    part.add_header("Content-Disposition", "attachment", filename=os.path.basename(xml))
+    encoders.encode_base64(part)
+    msg.attach(part)
+  return msg
 
-  for xml in files:
-          attachment = open(xml, "rb")
-          file_name = os.path.basename(xml)
-          part = MIMEBase("application", "octet-stream")
-          part.set_payload(attachment.read())
-          part.add_header("Content-Disposition", "attachment", filename=file_name)
-          encoders.encode_base64(part)
-          msg.attach(part)
 
-  try:
-    # Set SMTP server and send email
-    smtpserver = smtplib.SMTP("192.168.100.100")
-    smtpserver.sendmail(sender, receivers, msg.as_string())
-    smtpserver.quit()
-    logging.info("A notification email was successfully sent for Intersight service account and API availability test errors.")
-  except Exception:
-    logging.info("Unable to reach the SMTP server at 192.168.100.100.")
+class AlertQueue(object):
+  """A background queue for the Intersight service account email alerts. Alerts are queued without waiting on the
+  SMTP server. The alerts raised within the digest window are merged into one email, grouped by Intersight account,
+  and sent over an SMTP connection that is reused until it has been idle for the idle timeout.
+
+  Attributes:
+    digest_window: The number of seconds that alerts are collected for after the first alert, before they are
+      sent as one email.
+    suppression_window: The number of seconds after an alert during which new alerts for the same Intersight
+      account are not sent again.
+    idle_timeout: The number of seconds after which an idle SMTP connection is closed.
+    stats: A dictionary of alert counters.
+  """
+
+  def __init__(self,digest_window=alert_digest_window,suppression_window=alert_suppression_window,idle_timeout=alert_smtp_idle_timeout):
+    self.digest_window = digest_window
+    self.suppression_window = suppression_window
+    self.idle_timeout = idle_timeout
+    self.queue = queue.Queue()
+    self.lock = threading.Lock()
+    self.worker_thread = None
+    self.smtp_connection = None
+    self.alerted_accounts = {}
+    self.stats = {"queued": 0, "merged": 0, "suppressed": 0, "sent": 0, "emails": 0, "failures": 0}
+
+  def put(self,session):
+    """Queues an alert for the provided dCloud session details and returns immediately."""
+    with self.lock:
+      self.stats["queued"] += 1
+      if self.worker_thread is None or not self.worker_thread.is_alive():
+        self.worker_thread = threading.Thread(target=self.run, name="alert-queue", daemon=True)
+        self.worker_thread.start()
+    self.queue.put((time.time(), session))
+
+  def run(self):
+    """Sends the queued alerts as digests until the alert queue is stopped."""
+    while True:
+      try:
+        alert = self.queue.get(timeout=self.idle_timeout)
+      except queue.Empty:
+        self.close_connection()
+        continue
+      if alert is None:
+        self.close_connection()
+        return
+
+      # Collect the alerts raised within the digest window, unless the alert queue is being stopped
+      pending_alerts = [alert]
+      stopping = False
+      digest_deadline = time.monotonic() + self.digest_window
+      while not stopping:
+        try:
+          alert = self.queue.get(timeout=max(0, digest_deadline - time.monotonic()))
+        except queue.Empty:
+          break
+        if alert is None:
+          stopping = True
+        else:
+          pending_alerts.append(alert)
+      self.send_digest(pending_alerts)
+      if stopping:
+        self.close_connection()
+        return
+
+  def send_digest(self,pending_alerts):
+    """Merges the pending alerts by Intersight account and sends them as one email."""
+    alert_groups = {}
+    for alert_time, session in pending_alerts:
+      alert_groups.setdefault(session["intersight_account_name"], []).append((alert_time, session))
+    current_time = time.time()
+    with self.lock:
+      self.stats["merged"] += len(pending_alerts) - len(alert_groups)
+      for intersight_account_name in list(alert_groups):
+        if current_time - self.alerted_accounts.get(intersight_account_name, float("-inf")) < self.suppression_window:
+          self.stats["suppressed"] += len(alert_groups.pop(intersight_account_name))
+    if not alert_groups:
+      logging.info("The email alert for " + str(len(pending_alerts)) + " Intersight service account alerts was suppressed, as the accounts were recently alerted for.")
+      return
+    if self.send_message(create_alert_message(alert_groups)):
+      with self.lock:
+        self.stats["sent"] += sum(len(account_alerts) for account_alerts in alert_groups.values())
+        self.stats["emails"] += 1
+        for intersight_account_name in alert_groups:
+          self.alerted_accounts[intersight_account_name] = current_time
+      logging.info("A notification email was successfully sent for Intersight service account and API availability test errors of " + str(len(alert_groups)) + " accounts.")
+
+  def send_message(self,message):
+    """Sends an email over the reused SMTP connection, reconnecting once if the connection has been closed."""
+    import smtplib
+    for attempt in range(2):
+      try:
+        if self.smtp_connection is None:
+          self.smtp_connection = smtplib.SMTP(smtp_server, smtp_port, timeout=smtp_timeout)
+        self.smtp_connection.sendmail(sender, receivers, message.as_string())
+        return True
+      except (smtplib.SMTPException, OSError) as exception_message:
+        self.close_connection()
+        last_exception = exception_message
+    with self.lock:
+      self.stats["failures"] += 1
+    logging.info("Unable to reach the SMTP server at " + smtp_server + ".")
+    logging.info(last_exception)
+    return False
+
+  def close_connection(self):
+    """Closes the SMTP connection, if open."""
+    if self.smtp_connection is not None:
+      try:
+        self.smtp_connection.quit()
+      except Exception:
+        self.smtp_connection.close()
+      self.smtp_connection = None
+
+  def stop(self,timeout=None):
+    """Sends any pending alerts without waiting for the digest window, then stops the alert queue.
+
+    Args:
+      timeout: The maximum number of seconds to wait for the pending alerts to be sent. The default value is None,
+        which waits until they have been sent.
+    """
+    with self.lock:
+      worker_thread = self.worker_thread
+    if worker_thread is not None and worker_thread.is_alive():
+      self.queue.put(None)
+      worker_thread.join(timeout)
+
+  def get_stats(self):
+    """Returns a copy of the alert counters."""
+    with self.lock:
+      return dict(self.stats)
+
+
+# The alert queue shared by every dCloud session of the script
+alert_queue = AlertQueue()
+
+
+def intersight_account_status_alert(session):
+  """
+  Function to alert for Intersight service account and API availability test errors. The alert is queued on the
+  alert queue and sent in the background, so this function does not wait on the SMTP server.
+  """
+  alert_queue.put(session)
 
 
 # Establish function to test for the availability of the Intersight API and Intersight account
 
-def test_intersight_service():
+class CircuitBreaker(object):
+  """A circuit breaker shared by every dCloud session, so that an Intersight outage is detected once and the
+  availability tests of the other sessions fail quickly instead of each waiting on Intersight. The circuit opens
+  after a number of consecutive outage failures. While it is open, calls are rejected until the reset timeout has
+  passed, then a single trial call is allowed, which closes the circuit if it succeeds or opens it again if it fails.
+
+  Attributes:
+    failure_threshold: The number of consecutive failures that opens the circuit.
+    reset_timeout: The number of seconds the circuit stays open before a trial call is allowed.
+    stats: A dictionary of opened circuit and rejected call counters.
+  """
+
+  def __init__(self,failure_threshold,reset_timeout):
+    self.failure_threshold = failure_threshold
+    self.reset_timeout = reset_timeout
+    self.consecutive_failures = 0
+    self.opened_at = None
+    self.trial_in_progress = False
+    self.lock = threading.Lock()
+    self.stats = {"opened": 0, "rejected": 0}
+
+  def allow(self):
+    """Returns True if a call is allowed, otherwise False."""
+    with self.lock:
+      if self.opened_at is None:
+        return True
+      if time.monotonic() - self.opened_at >= self.reset_timeout and not self.trial_in_progress:
+        self.trial_in_progress = True
+        return True
+      self.stats["rejected"] += 1
+      return False
+
+  def record_success(self):
+    """Closes the circuit after a successful call."""
+    with self.lock:
+      self.consecutive_failures = 0
+      self.opened_at = None
+      self.trial_in_progress = False
+
+  def record_failure(self):
+    """Counts a failed call, opening the circuit at the failure threshold or if a trial call has failed."""
+    with self.lock:
+      self.consecutive_failures += 1
+      if self.trial_in_progress or (self.opened_at is None and self.consecutive_failures >= self.failure_threshold):
+        if self.opened_at is None:
+          self.stats["opened"] += 1
+          logging.info("The Intersight API circuit breaker has opened after " + str(self.consecutive_failures) + " consecutive failures.")
+        self.opened_at = time.monotonic()
+      self.trial_in_progress = False
+
+  def get_stats(self):
+    """Returns a copy of the circuit breaker statistics, with the current state."""
+    with self.lock:
+      return dict(self.stats, state="closed" if self.opened_at is None else "open")
+
+
+# The circuit breaker shared by every dCloud session of the script and the times of the last passed availability
+# tests, keyed by the response cache namespace of each Intersight API client
+availability_circuit_breaker = CircuitBreaker(circuit_breaker_failure_threshold,circuit_breaker_reset_timeout)
+availability_cache = {}
+availability_cache_lock = threading.Lock()
+
+
+def test_intersight_service(session,api_client=None):
   """This is a function to test the availability of the Intersight API and Intersight account. The Intersight account
-  tested for is the owner of the provided Intersight API key and key ID.
+  tested for is the owner of the provided Intersight API key and key ID. Only the name of one account is requested.
+  A passed test is cached for the availability_cache_window, and the test fails without contacting Intersight while
+  the shared circuit breaker is open. An email notification alert is sent if the test does not pass.
+
+  Args:
+    session: A dictionary of dCloud session details, as returned by the load_session function.
+    api_client: The Intersight API client to be tested. The default value is the api_instance client.
+
+  Returns:
+    A boolean value of True if the test has passed, otherwise False.
   """
+  if api_client is None:
+    api_client = api_instance
+  cache_namespace = get_cache_namespace(api_client)
+  with availability_cache_lock:
+    last_passed_time = availability_cache.get(cache_namespace)
+  if last_passed_time is not None and time.monotonic() - last_passed_time < availability_cache_window:
+    logging.info("The Intersight API and Account Availability Test has recently passed for the Intersight account named '" + session["intersight_account_name"] + "'.")
+    return True
+  if not availability_circuit_breaker.allow():
+    logging.info("The Intersight API and Account Availability Test did not pass, as the Intersight API circuit breaker is open after an Intersight API outage.")
+    logging.info("An email notification alert is being sent...")
+    intersight_account_status_alert(session)
+    return False
   try:
     # Check that Intersight Account is accessible
     logging.info("Testing access to the Intersight API by verifying the Intersight account information...")
-    check_account = intersight.IamAccountApi(api_instance)
-    get_account = check_account.iam_accounts_get()
-    if check_account.api_client.last_response.status is not 200:
-      logging.info("The Intersight API and Account Availability Test did not pass.")
-      logging.info("The Intersight account information could not be verified.")
-      logging.info("An email notification alert is being sent...")
-      intersight_account_status_alert()
-      logging.info("Exiting due to the Intersight account being unavailable.\n")
-      sys.exit(0)
+    response = iu_call_api(api_client,"/iam/Accounts","GET",max_retries=availability_test_max_retries,query_params=[("$select", "Name"), ("$top", 1)],_return_http_data_only=True,_preload_content=False)
+    account_results = json.loads(response.data).get("Results") or []
+    response.release_conn()
+  except Exception as exception_message:
+    status = getattr(exception_message, "status", None)
+    if status is None or (status in retryable_status_codes and status != 429):
+      availability_circuit_breaker.record_failure()
     else:
-      account_name = get_account.results[0].name
-      logging.info("The Intersight API and Account Availability Test has passed.")
-      logging.info("The Intersight account named '" + intersight_account_name + "' has been found.")
-  except Exception:
+      availability_circuit_breaker.record_success()
     logging.info("Unable to access the Intersight API.")
+    logging.info(exception_message)
     logging.info("An email notification alert is being sent...")
-    intersight_account_status_alert()
-    logging.info("Exiting due to the Intersight API being unavailable.\n")
-    sys.exit(0)
-
+    intersight_account_status_alert(session)
+    return False
+  availability_circuit_breaker.record_success()
+  if not account_results:
+    logging.info("The Intersight API and Account Availability Test did not pass.")
+    logging.info("The Intersight account information could not be verified.")
+    logging.info("An email notification alert is being sent...")
+    intersight_account_status_alert(session)
+    return False
+  with availability_cache_lock:
+    availability_cache[cache_namespace] = time.monotonic()
+  logging.info("The Intersight API and Account Availability Test has passed.")
+  logging.info("The Intersight account named '" + str(account_results[0].get("Name")) + "' has been found.")
+  return True
 
-# Run the Intersight API and Account Availability Test
-logging.info("Running the Intersight API and Account Availability Test.")
-test_intersight_service()
 
-# Create the HyperFlex Local Credential Policy for the Cluster Configuration "Security" policy type settings
+# Define the HyperFlex Local Credential Policy for the Cluster Configuration "Security" policy type settings
 local_credential_api_path = "hyperflex/LocalCredentialPolicies"
 local_credential_api_body = {
   "Name": "sample-local-credential-policy",
@@ -357,9 +2096,8 @@ local_credential_api_body = {
   "HypervisorAdminPwd": "C1sco12345!",
   "HxdpRootPwd": "C1sco12345!"
 }
-iu_post(local_credential_api_path, local_credential_api_body)
 
-# Create the HyperFlex System Configuration Policy for the Cluster Configuration "DNS, NTP, and Timezone" policy type settings
+# Define the HyperFlex System Configuration Policy for the Cluster Configuration "DNS, NTP, and Timezone" policy type settings
 system_configuration_api_path = "hyperflex/SysConfigPolicies"
 system_configuration_api_body = {
   "Name": "sample-sys-config-policy",
@@ -369,9 +2107,8 @@ system_configuration_api_body = {
   "NtpServers": ["198.18.128.1"],
   "Timezone": "America/New_York"
 }
-iu_post(system_configuration_api_path, system_configuration_api_body)
 
-# Create the HyperFlex VMware vCenter Configuration Policy for the Cluster Configuration "vCenter (Optional)" policy type settings
+# Define the HyperFlex VMware vCenter Configuration Policy for the Cluster Configuration "vCenter (Optional)" policy type settings
 vcenter_configuration_api_path = "hyperflex/VcenterConfigPolicies"
 vcenter_configuration_api_body = {
   "Name": "sample-vcenter-config-policy",
@@ -381,9 +2118,8 @@ vcenter_configuration_api_body = {
   "Username": "administrator@vsphere.local",
   "Password": "C1sco12345!"
 }
-iu_post(vcenter_configuration_api_path, vcenter_configuration_api_body)
 
-# Create the HyperFlex Cluster Storage Configuration Policy for the Cluster Configuration "Storage Configuration (Optional)" policy type settings
+# Define the HyperFlex Cluster Storage Configuration Policy for the Cluster Configuration "Storage Configuration (Optional)" policy type settings
 cluster_storage_api_path = "hyperflex/ClusterStoragePolicies"
 cluster_storage_api_body = {
   "Name": "sample-cluster-storage-policy",
@@ -391,9 +2127,8 @@ cluster_storage_api_body = {
   "DiskPartitionCleanup": True,
   "VdiOptimization": False
 }
-iu_post(cluster_storage_api_path, cluster_storage_api_body)
 
-# Create the HyperFlex Node Configuration Policy for the Cluster Configuration "IP & Hostname" policy type settings
+# Define the HyperFlex Node Configuration Policy for the Cluster Configuration "IP & Hostname" policy type settings
 node_configuration_api_path = "hyperflex/NodeConfigPolicies"
 node_configuration_api_body = {
   "Name": "sample-node-config-policy",
@@ -414,9 +2149,8 @@ node_configuration_api_body = {
     "StartAddr": "198.18.135.103"
   },
 }
-iu_post(node_configuration_api_path, node_configuration_api_body)
 
-# Create the HyperFlex Cluster Network Configuration Policy for the Cluster Configuration "Network Configuration" policy type settings
+# Define the HyperFlex Cluster Network Configuration Policy for the Cluster Configuration "Network Configuration" policy type settings
 cluster_network_api_path = "hyperflex/ClusterNetworkPolicies"
 cluster_network_api_body = {
   "Name": "sample-cluster-network-policy",
@@ -432,10 +2166,633 @@ cluster_network_api_body = {
     "StartAddr": "00:25:B5:00"
   },
 }
-iu_post(cluster_network_api_path, cluster_network_api_body)
 
-# Intersight HyperFlex policy creation complete
-logging.info("The Intersight Policy Set Creator for HyperFlex Edge Script is complete.\n")
+# Define all of the HyperFlex policies to be created, as none of the policies depend on each other
+hyperflex_policy_requests = [
+  (local_credential_api_path, local_credential_api_body),
+  (system_configuration_api_path, system_configuration_api_body),
+  (vcenter_configuration_api_path, vcenter_configuration_api_body),
+  (cluster_storage_api_path, cluster_storage_api_body),
+  (node_configuration_api_path, node_configuration_api_body),
+  (cluster_network_api_path, cluster_network_api_body)
+]
+
+# Define the results that indicate a HyperFlex policy is in place
+successful_policy_results = ("The POST method was successful.", "The PATCH method was successful.", "No changes were needed.", "The operation was completed in a previous run.")
+
+
+# Establish IP and MAC address range allocation functions
+
+class RangeAllocator(object):
+  """An allocator of non-overlapping ranges of integer values from a pool, such as IP addresses or MAC address
+  prefixes. The allocated ranges are kept in an interval index of sorted range starts and ends, so a range is
+  checked for overlaps with a binary search, and new ranges are allocated from a cursor that follows the last
+  allocated range. Each range is allocated to an owner, which keeps the range until it is released.
+
+  Attributes:
+    pool_start: The first value of the pool.
+    pool_end: The last value of the pool.
+    allocations: A dictionary of the allocated ranges, keyed by owner. Each range is a tuple of the first and last
+      values of the range.
+    version: The number of changes made to the allocated ranges, used to tell if they need to be saved.
+  """
+
+  def __init__(self,pool_start,pool_end):
+    self.pool_start = pool_start
+    self.pool_end = pool_end
+    self.starts = []
+    self.ends = []
+    self.allocations = {}
+    self.cursor = pool_start
+    self.version = 0
+    self.lock = threading.Lock()
+
+  def find_overlap(self,start,end):
+    """Returns the index of the allocated range overlapping the provided range, or None if the range is free."""
+    index = bisect.bisect_right(self.starts, end) - 1
+    if index >= 0 and self.ends[index] >= start:
+      return index
+    return None
+
+  def insert(self,owner,start,end):
+    index = bisect.bisect_left(self.starts, start)
+    self.starts.insert(index, start)
+    self.ends.insert(index, end)
+    self.allocations[owner] = (start, end)
+    self.version += 1
+
+  def remove(self,owner):
+    start, end = self.allocations.pop(owner)
+    index = bisect.bisect_left(self.starts, start)
+    del self.starts[index]
+    del self.ends[index]
+    self.cursor = max(self.pool_start, min(self.cursor, start))
+    self.version += 1
+
+  def reserve(self,owner,start,end):
+    """Allocates the provided range to an owner, replacing any other range of the owner, if the range does not
+    overlap a range of another owner. Returns True if the range has been allocated to the owner, otherwise False."""
+    with self.lock:
+      if self.allocations.get(owner) == (start, end):
+        return True
+      overlap_index = self.find_overlap(start, end)
+      if overlap_index is not None:
+        return False
+      if owner in self.allocations:
+        self.remove(owner)
+      self.insert(owner, start, end)
+      return True
+
+  def allocate(self,owner,size):
+    """Returns the range allocated to an owner, allocating the next free range of the provided size if the owner
+    does not have a range of that size.
+
+    Raises:
+      ValueError: There is no free range of the provided size left in the pool.
+    """
+    with self.lock:
+      allocated_range = self.allocations.get(owner)
+      if allocated_range and allocated_range[1] - allocated_range[0] + 1 == size:
+        return allocated_range
+      if allocated_range:
+        self.remove(owner)
+      candidate_start = self.cursor
+      wrapped = False
+      while True:
+        if candidate_start + size - 1 > self.pool_end:
+          if wrapped:
+            raise ValueError("There is no free range of " + str(size) + " values left in the pool.")
+          candidate_start, wrapped = self.pool_start, True
+          continue
+        overlap_index = self.find_overlap(candidate_start, candidate_start + size - 1)
+        if overlap_index is None:
+          break
+        candidate_start = self.ends[overlap_index] + 1
+      self.insert(owner, candidate_start, candidate_start + size - 1)
+      self.cursor = candidate_start + size
+      return self.allocations[owner]
+
+  def release(self,owner):
+    """Releases the range allocated to an owner, if any."""
+    with self.lock:
+      if owner in self.allocations:
+        self.remove(owner)
+
+  def reset(self):
+    """Releases every allocated range."""
+    with self.lock:
+      self.starts = []
+      self.ends = []
+      self.allocations = {}
+      self.cursor = self.pool_start
+      self.version += 1
+
+  def get_allocations(self):
+    """Returns a copy of the allocated ranges, keyed by owner."""
+    with self.lock:
+      return dict(self.allocations)
+
+
+def ip_address_to_int(ip_address):
+  return int(ipaddress.IPv4Address(ip_address))
+
+
+def int_to_ip_address(value):
+  return str(ipaddress.IPv4Address(value))
+
+
+def mac_prefix_to_int(mac_prefix):
+  return int(mac_prefix.replace(":", ""), 16)
+
+
+def int_to_mac_prefix(value):
+  hex_value = "%08X" % value
+  return ":".join(hex_value[index:index + 2] for index in range(0, 8, 2))
+
+
+# The IP address and MAC address prefix allocators shared by every dCloud session of the script
+ip_address_allocator = RangeAllocator(ip_address_to_int(ip_address_pool[0]), ip_address_to_int(ip_address_pool[1]))
+mac_prefix_allocator = RangeAllocator(mac_prefix_to_int(mac_prefix_pool[0]), mac_prefix_to_int(mac_prefix_pool[1]))
+range_allocators = {
+  "ip_addresses": (ip_address_allocator, ip_address_to_int, int_to_ip_address),
+  "mac_prefixes": (mac_prefix_allocator, mac_prefix_to_int, int_to_mac_prefix)
+}
+range_allocation_lock = threading.Lock()
+
+
+def get_range_allocation_versions():
+  """Returns the versions of the IP address and MAC address prefix allocators."""
+  return [allocator.version for allocator, parse_value, format_value in range_allocators.values()]
+
+
+def load_range_allocations(allocation_file=range_allocation_file):
+  """This is a function to load the IP address and MAC address prefix ranges allocated by previous runs.
+
+  Args:
+    allocation_file: The path to the range allocation file. The default value is
+      "c:\\dcloud\\range_allocations.json".
+  """
+  try:
+    with open(allocation_file) as allocation_input:
+      saved_allocations = json.load(allocation_input)
+  except (OSError, ValueError):
+    return
+  for allocator_name, (allocator, parse_value, format_value) in range_allocators.items():
+    for owner, (start, end) in saved_allocations.get(allocator_name, {}).items():
+      allocator.reserve(owner, parse_value(start), parse_value(end))
+
+
+def save_range_allocations(allocation_file=range_allocation_file):
+  """This is a function to save the allocated IP address and MAC address prefix ranges, so that each cluster keeps
+  its ranges in later runs.
+
+  Args:
+    allocation_file: The path to the range allocation file. The default value is
+      "c:\\dcloud\\range_allocations.json".
+  """
+  with range_allocation_lock:
+    saved_allocations = {}
+    for allocator_name, (allocator, parse_value, format_value) in range_allocators.items():
+      saved_allocations[allocator_name] = {owner: [format_value(start), format_value(end)] for owner, (start, end) in sorted(allocator.get_allocations().items())}
+    temporary_allocation_file = allocation_file + "." + str(os.getpid()) + ".tmp"
+    try:
+      with open(temporary_allocation_file, "w") as allocation_output:
+        json.dump(saved_allocations, allocation_output)
+      os.replace(temporary_allocation_file, allocation_file)
+    except OSError as exception_message:
+      logging.info("Unable to write the range allocation file '" + allocation_file + "'.")
+      logging.info(exception_message)
+
+
+def seed_range_allocations(session,api_client=None):
+  """This is a function to seed the IP address and MAC address prefix allocators with the ranges of the existing
+  Node Configuration and Cluster Network Configuration policies of the Intersight account of a dCloud session. The
+  ranges of the sample policies are kept for the cluster of the session, unless they are allocated to another
+  cluster, and the ranges of any other policies are reserved so that they are not allocated.
+
+  Args:
+    session: A dictionary of dCloud session details, as returned by the load_session function.
+    api_client: The Intersight API client of the Intersight service account. The default value is the
+      api_instance client.
+
+  Raises:
+    Exception: The existing policies could not be retrieved, so their ranges cannot be reserved.
+  """
+  cluster_owner = session["datacenter_name"] + "/" + session["cluster_name"]
+  seeded_policy_types = (
+    (node_configuration_api_path, node_configuration_api_body["Name"], ip_address_allocator, ip_address_to_int, (("MgmtIpRange", "/mgmt"), ("HxdpIpRange", "/hxdp"))),
+    (cluster_network_api_path, cluster_network_api_body["Name"], mac_prefix_allocator, mac_prefix_to_int, (("MacPrefixRange", "/mac"),))
+  )
+  for api_path, sample_policy_name, allocator, parse_value, range_properties in seeded_policy_types:
+    if all(cluster_owner + owner_suffix in allocator.allocations for range_property, owner_suffix in range_properties):
+      continue
+    for existing_policy in iu_get_paged(api_path, select=["Name"] + [range_property for range_property, owner_suffix in range_properties], api_client=api_client, raise_errors=True):
+      for range_property, owner_suffix in range_properties:
+        existing_range = existing_policy.get(range_property) or {}
+        try:
+          range_start, range_end = parse_value(existing_range["StartAddr"]), parse_value(existing_range["EndAddr"])
+        except (KeyError, TypeError, ValueError):
+          continue
+        if existing_policy.get("Name") == sample_policy_name:
+          range_owner = cluster_owner + owner_suffix
+        else:
+          range_owner = session["intersight_account_name"] + "/" + existing_policy["Moid"] + owner_suffix
+        if not allocator.reserve(range_owner, range_start, range_end):
+          logging.info("The " + range_property + " of the policy '" + str(existing_policy.get("Name")) + "' is already allocated to another cluster.")
+
+
+def get_hyperflex_policy_requests(session,api_client=None):
+  """This is a function to create the HyperFlex policy requests of a dCloud session. The Node Configuration and
+  Cluster Network Configuration policies use the IP address and MAC address prefix ranges allocated to the cluster
+  of the session, which are allocated the first time they are needed. New allocations are saved to the range
+  allocation file right away, so that an interrupted run does not allocate the same ranges to another cluster.
+
+  Args:
+    session: A dictionary of dCloud session details, as returned by the load_session function.
+    api_client: The Intersight API client of the Intersight service account, used to seed the allocators with
+      the existing policies. The default value is the api_instance client.
+
+  Returns:
+    A list of tuples, each containing the path to the HyperFlex policy API type and the body configuration data,
+    in the same order as hyperflex_policy_requests.
+
+  Raises:
+    ValueError: There are no free IP address or MAC address prefix ranges left.
+    Exception: The existing policies could not be retrieved to seed the allocators.
+  """
+  cluster_owner = session["datacenter_name"] + "/" + session["cluster_name"]
+  allocation_versions = get_range_allocation_versions()
+  with timed_phase("range_allocation"):
+    seed_range_allocations(session, api_client)
+    mgmt_ip_range = ip_address_allocator.allocate(cluster_owner + "/mgmt", cluster_node_count)
+    hxdp_ip_range = ip_address_allocator.allocate(cluster_owner + "/hxdp", cluster_node_count)
+    mac_prefix_range = mac_prefix_allocator.allocate(cluster_owner + "/mac", 1)
+    if get_range_allocation_versions() != allocation_versions:
+      save_range_allocations(range_allocation_file)
+
+  node_configuration_body = copy.deepcopy(node_configuration_api_body)
+  node_configuration_body["MgmtIpRange"].update(StartAddr=int_to_ip_address(mgmt_ip_range[0]), EndAddr=int_to_ip_address(mgmt_ip_range[1]))
+  node_configuration_body["HxdpIpRange"].update(StartAddr=int_to_ip_address(hxdp_ip_range[0]), EndAddr=int_to_ip_address(hxdp_ip_range[1]))
+  cluster_network_body = copy.deepcopy(cluster_network_api_body)
+  cluster_network_body["MacPrefixRange"].update(StartAddr=int_to_mac_prefix(mac_prefix_range[0]), EndAddr=int_to_mac_prefix(mac_prefix_range[1]))
+  allocated_bodies = {node_configuration_api_path: node_configuration_body, cluster_network_api_path: cluster_network_body}
+  return [(api_path, allocated_bodies.get(api_path, body)) for api_path, body in hyperflex_policy_requests]
+
+
+# Establish HyperFlex policy provisioning functions
+
+def provision_session(session,api_client=None,reconcile=False,bulk=False):
+  """This is a function to create the HyperFlex policies in the Intersight service account of a dCloud session.
+  The Intersight API and Account Availability Test is run before any of the policies are created. The policies that
+  the run journal records as completed by an interrupted run are skipped, and the availability test is skipped too
+  if all of the policies have been completed. If the interrupted run planned any of the remaining policies without
+  completing them, the policies are reconciled instead of created, since they may already exist.
+
+  Args:
+    session: A dictionary of dCloud session details, as returned by the load_session function.
+    api_client: The Intersight API client of the Intersight service account. The default value is the
+      api_instance client.
+    reconcile: If True, the existing HyperFlex policies are looked up and only the missing or changed policies
+      are created or updated. The default value is False.
+    bulk: If True, the HyperFlex policies are submitted with a single Intersight bulk request. The default value
+      is False.
+
+  Returns:
+    A dictionary containing the session ID, the Intersight service account name, the provisioning status and
+    the result of each HyperFlex policy request keyed by the API type path.
+  """
+  session_result = {
+    "session": session["intersight_account_session"],
+    "account": session["intersight_account_name"],
+    "cluster": session["cluster_name"],
+    "status": "unavailable",
+    "policy_results": {}
+  }
+
+  # Skip the HyperFlex policies completed by an interrupted run, as recorded in the run journal
+  journal_account = get_cache_namespace(api_client if api_client is not None else api_instance)
+  completed_requests = [run_journal.is_completed(journal_account, api_path, body["Name"]) for api_path, body in hyperflex_policy_requests]
+  if all(completed_requests):
+    logging.info("All of the HyperFlex policies for session ID #" + session_result["session"] + " were completed by a previous run.")
+    for api_path, body in hyperflex_policy_requests:
+      session_result["policy_results"][api_path] = "The operation was completed in a previous run."
+    session_result["status"] = "completed"
+    return session_result
+
+  # Run the Intersight API and Account Availability Test
+  logging.info("Running the Intersight API and Account Availability Test for session ID #" + session_result["session"] + ".")
+  with timed_phase("availability_test") as phase_record:
+    if not test_intersight_service(session, api_client):
+      phase_record["status"] = "unavailable"
+  if phase_record["status"] == "unavailable":
+    logging.info("Skipping the HyperFlex policies for session ID #" + session_result["session"] + " due to the Intersight account being unavailable.")
+    return session_result
+
+  # Create the HyperFlex policy requests with the IP address and MAC address prefix ranges of the cluster
+  try:
+    session_policy_requests = get_hyperflex_policy_requests(session, api_client)
+  except Exception as exception_message:
+    logging.info("Unable to allocate the IP address and MAC address prefix ranges for session ID #" + session_result["session"] + ".")
+    logging.info(exception_message)
+    session_result["status"] = "failed"
+    return session_result
+
+  # Reconcile the HyperFlex policies that an interrupted run may have created, instead of creating them again
+  pending_policy_requests = [policy_request for policy_request, completed_request in zip(session_policy_requests, completed_requests) if not completed_request]
+  if not reconcile and any(run_journal.is_in_doubt(journal_account, api_path, body["Name"]) for api_path, body in pending_policy_requests):
+    logging.info("Reconciling the HyperFlex policies for session ID #" + session_result["session"] + " as an interrupted run may have created some of them.")
+    reconcile = True
+
+  # Record the planned HyperFlex policy requests in the run journal
+  for api_path, body in pending_policy_requests:
+    run_journal.record("planned", account=journal_account, method="RECONCILE" if reconcile else "POST", api_path=api_path, name=body["Name"], session=session_result["session"])
+
+  # Create all of the pending HyperFlex policies concurrently
+  policy_creation_mode = ("reconcile-" if reconcile else "") + ("bulk" if bulk else "concurrent")
+  with timed_phase("policy_creation", mode=policy_creation_mode) as phase_record:
+    if reconcile:
+      logging.info("Reconciling the HyperFlex policies with up to " + str(policy_creation_max_workers) + " concurrent requests.")
+      policy_results = iu_reconcile(pending_policy_requests, policy_creation_max_workers, api_client, bulk)
+    elif bulk:
+      logging.info("Creating the HyperFlex policies with a single bulk request.")
+      policy_results = iu_post_bulk(pending_policy_requests, api_client)
+    else:
+      logging.info("Creating the HyperFlex policies with up to " + str(policy_creation_max_workers) + " concurrent requests.")
+      policy_results = iu_post_concurrent(pending_policy_requests, policy_creation_max_workers, api_client)
+    for (api_path, body), policy_result in zip(pending_policy_requests, policy_results):
+      if policy_result == "No changes were needed.":
+        run_journal.record("completed", account=journal_account, method="RECONCILE", api_path=api_path, name=body["Name"], moid=None, status="unchanged")
+    pending_policy_results = iter(policy_results)
+    policy_results = ["The operation was completed in a previous run." if completed_request else next(pending_policy_results) for completed_request in completed_requests]
+    for (api_path, body), policy_result in zip(session_policy_requests, policy_results):
+      session_result["policy_results"][api_path] = policy_result
+    if all(policy_result in successful_policy_results for policy_result in policy_results):
+      session_result["status"] = "completed"
+    else:
+      session_result["status"] = "incomplete"
+    phase_record["status"] = session_result["status"]
+  return session_result
+
+
+def teardown_session(session,api_client=None,bulk=False):
+  """This is a function to delete the sample HyperFlex policies from the Intersight service account of a dCloud
+  session, so that the account can be reused by the next session. Every policy of the HyperFlex policy types with a
+  name starting with teardown_name_prefix is deleted. The Intersight API and Account Availability Test is run before
+  any of the policies are deleted.
+
+  Args:
+    session: A dictionary of dCloud session details, as returned by the load_session function.
+    api_client: The Intersight API client of the Intersight service account. The default value is the
+      api_instance client.
+    bulk: If True, the HyperFlex policies are deleted with Intersight bulk requests. The default value is False.
+
+  Returns:
+    A dictionary containing the session ID, the Intersight service account name, the teardown status and the
+    result of each deleted HyperFlex policy, as returned by the iu_delete_matching function.
+  """
+  session_result = {
+    "session": session["intersight_account_session"],
+    "account": session["intersight_account_name"],
+    "cluster": session["cluster_name"],
+    "status": "unavailable",
+    "policy_results": {},
+    "teardown_results": []
+  }
+
+  # Run the Intersight API and Account Availability Test
+  logging.info("Running the Intersight API and Account Availability Test for session ID #" + session_result["session"] + ".")
+  with timed_phase("availability_test") as phase_record:
+    if not test_intersight_service(session, api_client):
+      phase_record["status"] = "unavailable"
+  if phase_record["status"] == "unavailable":
+    logging.info("Skipping the HyperFlex policy teardown for session ID #" + session_result["session"] + " due to the Intersight account being unavailable.")
+    return session_result
+
+  # Delete the sample HyperFlex policies of every HyperFlex policy type
+  teardown_api_paths = sorted(set(api_path for api_path, body in hyperflex_policy_requests))
+  teardown_filter = "startswith(Name,'" + teardown_name_prefix.replace("'", "''") + "')"
+  with timed_phase("teardown", mode="bulk" if bulk else "concurrent") as phase_record:
+    logging.info("Deleting the HyperFlex policies matching " + teardown_filter + " with up to " + str(teardown_max_workers) + " concurrent requests.")
+    session_result["teardown_results"] = iu_delete_matching(teardown_api_paths, teardown_filter, teardown_max_workers, api_client, bulk)
+    for teardown_result in session_result["teardown_results"]:
+      logging.info("Teardown of '" + str(teardown_result["name"]) + "' (/" + teardown_result["api_path"] + "/" + str(teardown_result["moid"]) + "): " + teardown_result["result"])
+    if all(teardown_result["result"] == "The DELETE method was successful." for teardown_result in session_result["teardown_results"]):
+      session_result["status"] = "completed"
+    else:
+      session_result["status"] = "incomplete"
+    phase_record["status"] = session_result["status"]
+  return session_result
+
+
+def find_session_files(session_descriptors):
+  """This is a function to expand a list of dCloud session.xml files and directories into a list of session.xml
+  files. Every XML file found directly under a provided directory is treated as a session.xml file.
+
+  Args:
+    session_descriptors: A list of paths to dCloud session.xml files and/or directories of session.xml files.
+
+  Returns:
+    A sorted list of paths to dCloud session.xml files.
+  """
+  session_files = []
+  for session_descriptor in session_descriptors:
+    if os.path.isdir(session_descriptor):
+      session_files.extend(glob.glob(os.path.join(session_descriptor, "*.xml")))
+    else:
+      session_files.append(session_descriptor)
+  return sorted(set(session_files))
+
+
+def provision_session_file(session_xml_path,clusters_directory=dcloud_clusters_directory,reconcile=False,bulk=False,teardown=False):
+  """This is a function to load a dCloud session.xml file, create an Intersight API client for the assigned
+  Intersight service account, and create the HyperFlex policies, or delete them in teardown mode. Each session gets
+  its own Intersight API client.
+
+  Args:
+    session_xml_path: The path to the dCloud session.xml file.
+    clusters_directory: The path to the directory containing the cluster.xml files and Intersight API keys of
+      each datacenter. The default value is "c:\\Scripts\\Clusters".
+    reconcile: If True, only the missing or changed HyperFlex policies are created or updated. The default value
+      is False.
+    bulk: If True, the HyperFlex policies are submitted with a single Intersight bulk request. The default value
+      is False.
+    teardown: If True, the sample HyperFlex policies are deleted instead of created. The default value is False.
+
+  Returns:
+    A dictionary containing the provisioning results of the session, as returned by the provision_session function,
+    or the teardown results of the session, as returned by the teardown_session function.
+    If the session could not be loaded, the status will be "failed" and the error will be provided.
+  """
+  try:
+    session = load_session(session_xml_path, clusters_directory)
+    session_api_client = create_api_client(session)
+  except Exception as exception_message:
+    logging.info("Unable to load the dCloud session file '" + session_xml_path + "'.")
+    logging.info(exception_message)
+    return {"session_xml_path": session_xml_path, "status": "failed", "error": str(exception_message), "policy_results": {}}
+  if teardown:
+    session_result = teardown_session(session, session_api_client, bulk)
+  else:
+    session_result = provision_session(session, session_api_client, reconcile, bulk)
+  session_result["session_xml_path"] = session_xml_path
+  return session_result
+
+
+def run_fleet(session_descriptors,max_workers=fleet_max_workers,clusters_directory=dcloud_clusters_directory,reconcile=False,bulk=False,teardown=False):
+  """This is a function to create the HyperFlex policies for many dCloud sessions in one process. The sessions
+  are provisioned in parallel, with a bounded number of sessions in progress at the same time.
+
+  Args:
+    session_descriptors: A list of paths to dCloud session.xml files and/or directories of session.xml files.
+    max_workers: The maximum number of sessions that can be provisioned at the same time. The default value is
+      set by the fleet_max_workers variable.
+    clusters_directory: The path to the directory containing the cluster.xml files and Intersight API keys of
+      each datacenter. The default value is "c:\\Scripts\\Clusters".
+    reconcile: If True, only the missing or changed HyperFlex policies are created or updated. The default value
+      is False.
+    bulk: If True, the HyperFlex policies are submitted with a single Intersight bulk request. The default value
+      is False.
+    teardown: If True, the sample HyperFlex policies of each session are deleted instead of created. The default
+      value is False.
+
+  Returns:
+    A list of dictionaries containing the provisioning or teardown results of each session, in the same order as the
+    session.xml files returned by the find_session_files function.
+  """
+  session_files = find_session_files(session_descriptors)
+  if not session_files:
+    logging.info("No dCloud session files were found for fleet mode.")
+    return []
+  worker_count = max(1, min(max_workers, len(session_files)))
+  logging.info("Provisioning " + str(len(session_files)) + " dCloud sessions with up to " + str(worker_count) + " concurrent sessions.")
+  with concurrent.futures.ThreadPoolExecutor(max_workers=worker_count) as executor:
+    session_futures = [executor.submit(provision_session_file, session_file, clusters_directory, reconcile, bulk, teardown) for session_file in session_files]
+    fleet_results = [session_future.result() for session_future in session_futures]
+
+  # Log the per-session result summary
+  logging.info("Fleet mode summary:")
+  for session_result in fleet_results:
+    if teardown:
+      # A session that could not be loaded has no teardown results
+      teardown_results = session_result.get("teardown_results") or []
+      deleted_policy_count = len([teardown_result for teardown_result in teardown_results if teardown_result["result"] == "The DELETE method was successful."])
+      logging.info(session_result["session_xml_path"] + ": " + session_result["status"] + " (" + str(deleted_policy_count) + " of " + str(len(teardown_results)) + " policies deleted)")
+      continue
+    successful_policy_count = len([policy_result for policy_result in session_result["policy_results"].values() if policy_result in successful_policy_results])
+    logging.info(session_result["session_xml_path"] + ": " + session_result["status"] + " (" + str(successful_policy_count) + " of " + str(len(hyperflex_policy_requests)) + " policies in place)")
+  return fleet_results
+
+
+def parse_arguments(argv=None):
+  """This is a function to parse the command line arguments of the HyperFlex Edge Policy Maker script.
+
+  Args:
+    argv: An optional list of command line arguments. The default value is the arguments of the running process.
+
+  Returns:
+    An argparse.Namespace object containing the parsed command line arguments.
+  """
+  argument_parser = argparse.ArgumentParser(description="Create sample HyperFlex Edge policies in Cisco Intersight for dCloud sessions.")
+  argument_parser.add_argument("--fleet", nargs="+", metavar="SESSION_PATH", help="Provision many dCloud sessions from session.xml files and/or directories of session.xml files.")
+  argument_parser.add_argument("--reconcile", action="store_true", help="Only create the missing HyperFlex policies and update the changed HyperFlex policies.")
+  argument_parser.add_argument("--bulk", action="store_true", help="Submit the HyperFlex policies of each session with a single Intersight bulk request.")
+  argument_parser.add_argument("--teardown", action="store_true", help="Delete the sample HyperFlex policies (named " + teardown_name_prefix + "*) instead of creating them, to reset the Intersight accounts between sessions.")
+  argument_parser.add_argument("--resume", action="store_true", help="Resume an interrupted run, skipping the HyperFlex policies that the run journal records as completed.")
+  argument_parser.add_argument("--journal-file", default=run_journal_file, help="The run journal file, in which each Intersight API write operation is recorded. The default value is " + run_journal_file + ".")
+  argument_parser.add_argument("--rate-limit", type=float, default=request_rate_limit, help="The maximum average number of Intersight API requests per second for each Intersight account (0 for no limit). The default value is " + str(request_rate_limit) + ".")
+  argument_parser.add_argument("--response-cache", type=int, default=response_cache_size, metavar="SIZE", help="The maximum number of Intersight API GET responses cached by iu_get and iu_get_moid (0 to disable the cache). The default value is " + str(response_cache_size) + ".")
+  argument_parser.add_argument("--response-cache-file", default=response_cache_file, help="An optional file in which the cached Intersight API GET responses are kept across runs.")
+  argument_parser.add_argument("--session-xml", default=dcloud_session_xml, help="The dCloud session.xml file to provision when fleet mode is not used. The default value is " + dcloud_session_xml + ".")
+  argument_parser.add_argument("--clusters-directory", default=dcloud_clusters_directory, help="The directory containing the cluster.xml files and Intersight API keys of each datacenter. The default value is " + dcloud_clusters_directory + ".")
+  argument_parser.add_argument("--inventory-cache", default=cluster_inventory_cache_file, help="The cluster inventory cache file. The default value is " + cluster_inventory_cache_file + ".")
+  argument_parser.add_argument("--smtp-server", default=smtp_server, help="The SMTP server for the email alerts, as HOST or HOST:PORT. The default value is " + smtp_server + ".")
+  argument_parser.add_argument("--range-allocation-file", default=range_allocation_file, help="The file in which the IP address and MAC address prefix ranges allocated to each cluster are kept. The default value is " + range_allocation_file + ".")
+  argument_parser.add_argument("--base-url", default=base_url, help="The Intersight API base URL. The default value is " + base_url + ".")
+  argument_parser.add_argument("--log-file", default=log_file, help="The log file. The default value is " + log_file + ".")
+  argument_parser.add_argument("--metrics-file", help="An optional file for the run metrics summary, written at the end of the run. A file name ending in .prom is written in the Prometheus text format, otherwise JSON is written.")
+  argument_parser.add_argument("--metrics-log", help="An optional file for the structured JSON metric records of each API call and pipeline phase. By default, the records are written to the log file.")
+  return argument_parser.parse_args(argv)
+
+
+def main(argv=None):
+  """This is the main function of the HyperFlex Edge Policy Maker script. The logging is set up, then the HyperFlex
+  policies are created for the dCloud session of this host, or for every provided dCloud session in fleet mode.
+
+  Args:
+    argv: An optional list of command line arguments. The default value is the arguments of the running process.
+
+  Returns:
+    The exit code of the script.
+  """
+  global api_instance, base_url, cluster_inventory_cache_file, range_allocation_file, smtp_server, smtp_port
+  script_arguments = parse_arguments(argv)
+
+  # Setup Logging
+  logging.basicConfig(filename=script_arguments.log_file, level=logging.DEBUG, format="%(asctime)s %(message)s")
+  reset_metrics()
+  metrics_log_handler = None
+  if script_arguments.metrics_log:
+    metrics_log_handler = logging.FileHandler(script_arguments.metrics_log)
+    metrics_log_handler.setFormatter(logging.Formatter("%(message)s"))
+    metrics_logger.addHandler(metrics_log_handler)
+    metrics_logger.propagate = False
+  logging.info("Starting the Intersight Policy Set Creator for HyperFlex Edge Script.")
+  request_scheduler.rate = script_arguments.rate_limit
+  response_cache.max_entries = script_arguments.response_cache
+  range_allocation_file = script_arguments.range_allocation_file
+  load_range_allocations(range_allocation_file)
+  run_journal.open(script_arguments.journal_file, script_arguments.resume)
+  if script_arguments.resume:
+    logging.info("Resuming from the run journal with " + str(len(run_journal.completed_operations)) + " completed operations.")
+  if script_arguments.response_cache_file and response_cache.max_entries > 0:
+    response_cache.load(script_arguments.response_cache_file)
+  base_url = script_arguments.base_url
+  cluster_inventory_cache_file = script_arguments.inventory_cache
+  smtp_server, _, smtp_server_port = script_arguments.smtp_server.partition(":")
+  if smtp_server_port:
+    smtp_port = int(smtp_server_port)
+
+  try:
+    if script_arguments.fleet:
+      # Provision every provided dCloud session in fleet mode
+      run_fleet(script_arguments.fleet, clusters_directory=script_arguments.clusters_directory, reconcile=script_arguments.reconcile, bulk=script_arguments.bulk, teardown=script_arguments.teardown)
+    else:
+      # Provision the dCloud session of this host
+      current_session = load_session(script_arguments.session_xml, script_arguments.clusters_directory)
+      api_instance = create_api_client(current_session)
+      if script_arguments.teardown:
+        session_result = teardown_session(current_session, bulk=script_arguments.bulk)
+      else:
+        session_result = provision_session(current_session, reconcile=script_arguments.reconcile, bulk=script_arguments.bulk)
+      if session_result["status"] == "unavailable":
+        logging.info("Exiting due to the Intersight account being unavailable.\n")
+        return 0
+  finally:
+    # Send any pending email alerts, save the range allocations and close the run journal, then log the Intersight
+    # API request and alert statistics and write the run metrics
+    alert_queue.stop(smtp_timeout * 2)
+    save_range_allocations(range_allocation_file)
+    run_journal.close()
+    logging.info("Intersight API request statistics: " + json.dumps(request_scheduler.get_stats()))
+    logging.info("Email alert statistics: " + json.dumps(alert_queue.get_stats()))
+    logging.info("Intersight API circuit breaker statistics: " + json.dumps(availability_circuit_breaker.get_stats()))
+    logging.info("Run journal statistics: " + json.dumps(run_journal.get_stats()))
+    if response_cache.max_entries > 0:
+      logging.info("Intersight API response cache statistics: " + json.dumps(response_cache.get_stats()))
+      if script_arguments.response_cache_file:
+        response_cache.save(script_arguments.response_cache_file)
+    if script_arguments.metrics_file:
+      write_metrics_summary(script_arguments.metrics_file)
+    if metrics_log_handler is not None:
+      metrics_logger.removeHandler(metrics_log_handler)
+      metrics_log_handler.close()
+      metrics_logger.propagate = True
+
+  # Intersight HyperFlex policy creation complete
+  logging.info("The Intersight Policy Set Creator for HyperFlex Edge Script is complete.\n")
+  return 0
+
 
-# Exiting Intersight HyperFlex Policy Creator
-sys.exit(0)
+if __name__ == "__main__":
+  # Exiting Intersight HyperFlex Policy Creator
+  sys.exit(main())
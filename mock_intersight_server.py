@@ -0,0 +1,395 @@
+"""
+Mock Intersight Server for the HyperFlex Edge Policy Maker, v1.0
+Summary: A local stand-in for the Intersight API endpoints used by the HyperFlex Edge Policy Maker script, with
+configurable latency, error and throttling injection, and a local stand-in for the SMTP server of the email alerts.
+It is used to test and benchmark the script offline.
+Notes: Request signatures are not verified, but the keyId of the Authorization header selects the account, so each
+API key ID has its own objects. Objects are kept in memory and are lost when the server stops.
+"""
+
+# Import needed Python modules
+import sys
+import json
+import argparse
+import hashlib
+import random
+import re
+import socketserver
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl
+
+# Define the Intersight API types served by the mock server
+mock_api_types = (
+  "iam/Accounts",
+  "hyperflex/LocalCredentialPolicies",
+  "hyperflex/SysConfigPolicies",
+  "hyperflex/VcenterConfigPolicies",
+  "hyperflex/ClusterStoragePolicies",
+  "hyperflex/NodeConfigPolicies",
+  "hyperflex/ClusterNetworkPolicies"
+)
+
+# Define the API path prefix of the mock server
+mock_api_prefix = "/api/v1/"
+
+# Define the number of seconds between checks for a shutdown request, which is how long stopping a mock server takes
+mock_poll_interval = 0.05
+
+
+def filter_matches(query_filter,mock_object):
+  """This is a function to check whether an object matches a $filter query. The "Name eq 'value'",
+  "Name in ('value1','value2')" and "startswith(Name,'value')" forms are supported, combined with "and".
+
+  Args:
+    query_filter: The $filter query.
+    mock_object: The object to be checked.
+
+  Returns:
+    A boolean value of True if the object matches the $filter query, otherwise False.
+  """
+  for condition in re.split(r"\s+and\s+", query_filter.strip()):
+    eq_match = re.match(r"^(\w+)\s+eq\s+'((?:[^']|'')*)'$", condition)
+    in_match = re.match(r"^(\w+)\s+in\s+\((.*)\)$", condition)
+    startswith_match = re.match(r"^startswith\((\w+),\s*'((?:[^']|'')*)'\)$", condition)
+    if eq_match:
+      if mock_object.get(eq_match.group(1)) != eq_match.group(2).replace("''", "'"):
+        return False
+    elif in_match:
+      values = [value.replace("''", "'") for value in re.findall(r"'((?:[^']|'')*)'", in_match.group(2))]
+      if mock_object.get(in_match.group(1)) not in values:
+        return False
+    elif startswith_match:
+      if not str(mock_object.get(startswith_match.group(1), "")).startswith(startswith_match.group(2).replace("''", "'")):
+        return False
+    else:
+      raise ValueError("Unsupported $filter condition: " + condition)
+  return True
+
+
+def get_object_type(api_type):
+  """This is a function to determine the object type of an Intersight API type. For example, the object type of
+  "hyperflex/SysConfigPolicies" is "hyperflex.SysConfigPolicy".
+
+  Args:
+    api_type: The path to the Intersight API type.
+
+  Returns:
+    The object type of the Intersight API type.
+  """
+  object_type = api_type.replace("/", ".")
+  if object_type.endswith("ies"):
+    return object_type[:-len("ies")] + "y"
+  return object_type[:-len("s")]
+
+
+class MockHTTPServer(ThreadingHTTPServer):
+  """A threading HTTP server with a listen backlog large enough for concurrent fleet runs."""
+  request_queue_size = 128
+  daemon_threads = True
+
+
+class MockIntersightServer(object):
+  """A local HTTP server that mimics the Intersight API endpoints used by the HyperFlex Edge Policy Maker script.
+
+  Attributes:
+    latency: The number of seconds added to every response.
+    latency_jitter: The maximum number of random seconds added to the latency of every response.
+    error_rate: The fraction of requests that fail with a 503 error, between 0 and 1.
+    throttle_rate: The number of requests per second allowed before requests fail with a 429 error and a
+      Retry-After header. A value of 0 disables throttling.
+    url: The base URL of the mock Intersight API, for use as the host of an Intersight API client.
+    stats: A dictionary of request counters keyed by method and status code.
+  """
+
+  def __init__(self,host="127.0.0.1",port=0,latency=0.0,latency_jitter=0.0,error_rate=0.0,throttle_rate=0,account_name="mock-account"):
+    self.latency = latency
+    self.latency_jitter = latency_jitter
+    self.error_rate = error_rate
+    self.throttle_rate = throttle_rate
+    self.account_name = account_name
+    self.lock = threading.Lock()
+    self.accounts = {}
+    self.stats = {}
+    self.throttle_window = (0, 0)
+    self.reset()
+    self.http_server = MockHTTPServer((host, port), self.create_handler())
+    self.url = "http://" + host + ":" + str(self.http_server.server_address[1]) + mock_api_prefix.rstrip("/")
+    self.server_thread = None
+
+  def reset(self):
+    """Removes all accounts and created objects and clears the request counters."""
+    with self.lock:
+      self.accounts = {}
+      self.stats = {}
+
+  def get_account_objects(self,api_key_id):
+    """Returns the objects of the account owning the provided API key ID, creating the account if needed."""
+    if api_key_id not in self.accounts:
+      account_objects = {api_type: {} for api_type in mock_api_types}
+      account_moid = uuid.uuid4().hex[:24]
+      account_name = self.account_name + "-" + str(len(self.accounts) + 1)
+      account_objects["iam/Accounts"][account_moid] = {"Moid": account_moid, "Name": account_name, "ObjectType": "iam.Account", "ClassId": "iam.Account"}
+      self.accounts[api_key_id] = account_objects
+    return self.accounts[api_key_id]
+
+  def start(self):
+    """Starts serving requests on a background thread and returns the mock server."""
+    self.server_thread = threading.Thread(target=self.http_server.serve_forever, args=(mock_poll_interval,), daemon=True)
+    self.server_thread.start()
+    return self
+
+  def stop(self):
+    """Stops serving requests and closes the listening socket."""
+    self.http_server.shutdown()
+    self.http_server.server_close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self,exc_type,exc_value,traceback):
+    self.stop()
+
+  def get_stats(self):
+    """Returns a copy of the request counters."""
+    with self.lock:
+      return dict(self.stats)
+
+  def count_request(self,method,status):
+    with self.lock:
+      stats_key = method + " " + str(status)
+      self.stats[stats_key] = self.stats.get(stats_key, 0) + 1
+
+  def inject_failure(self):
+    """Returns the status code and headers of an injected failure, or None if the request should be handled."""
+    if self.throttle_rate:
+      with self.lock:
+        window_second, window_count = self.throttle_window
+        current_second = int(time.monotonic())
+        if window_second != current_second:
+          window_second, window_count = current_second, 0
+        window_count += 1
+        self.throttle_window = (window_second, window_count)
+      if window_count > self.throttle_rate:
+        return 429, {"Retry-After": "1"}
+    if self.error_rate and random.random() < self.error_rate:
+      return 503, {}
+    return None
+
+  def handle_request(self,method,path,query,body,api_key_id=""):
+    """Handles a request to the mock Intersight API and returns the status code and response body."""
+    api_path = path[len(mock_api_prefix):].strip("/") if path.startswith(mock_api_prefix) else None
+    if api_path == "bulk/Requests" and method == "POST":
+      return self.handle_bulk_request(body, api_key_id)
+    path_parts = (api_path or "").split("/")
+    api_type = "/".join(path_parts[:2])
+    if api_type not in mock_api_types or len(path_parts) > 3:
+      return 404, {"code": "NotFound", "message": "The requested resource path was not found."}
+    moid = path_parts[2] if len(path_parts) == 3 else None
+    with self.lock:
+      collection = self.get_account_objects(api_key_id)[api_type]
+      if moid is None and method == "GET":
+        return 200, self.list_objects(collection, query)
+      if moid is None and method == "POST":
+        if any(existing_object.get("Name") == body.get("Name") for existing_object in collection.values()):
+          return 409, {"code": "Conflict", "message": "An object with the name '" + str(body.get("Name")) + "' already exists."}
+        new_moid = uuid.uuid4().hex[:24]
+        object_type = get_object_type(api_type)
+        new_object = dict(body, Moid=new_moid, ObjectType=object_type, ClassId=object_type, ModTime=time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()))
+        collection[new_moid] = new_object
+        return 200, new_object
+      if moid not in collection:
+        return 404, {"code": "NotFound", "message": "The object '" + str(moid) + "' was not found."}
+      if method == "GET":
+        return 200, collection[moid]
+      if method in ("PATCH", "POST"):
+        collection[moid].update(body)
+        collection[moid]["ModTime"] = time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())
+        return 200, collection[moid]
+      if method == "DELETE":
+        del collection[moid]
+        return 200, {}
+    return 405, {"code": "MethodNotAllowed", "message": "The method " + method + " is not allowed."}
+
+  def list_objects(self,collection,query):
+    results = list(collection.values())
+    if query.get("$filter"):
+      results = [result for result in results if filter_matches(query["$filter"], result)]
+    if query.get("$orderby"):
+      order_property, _, order_direction = query["$orderby"].partition(" ")
+      results.sort(key=lambda result: str(result.get(order_property, "")), reverse=order_direction.strip().lower() == "desc")
+    skip = int(query.get("$skip", 0))
+    top = int(query.get("$top", 1000))
+    results = results[skip:skip + top]
+    if query.get("$select"):
+      selected_properties = set(query["$select"].split(",")) | {"Moid", "ObjectType", "ClassId"}
+      results = [{key: value for key, value in result.items() if key in selected_properties} for result in results]
+    return {"ObjectType": "mo.List", "Count": len(results), "Results": results}
+
+  def handle_bulk_request(self,body,api_key_id):
+    sub_results = []
+    for sub_request in body.get("Requests", []):
+      sub_request_path = mock_api_prefix + sub_request.get("Uri", "").split("/v1/", 1)[-1]
+      status, sub_result_body = self.handle_request(sub_request.get("Verb", body.get("Verb", "POST")), sub_request_path, {}, sub_request.get("Body") or {}, api_key_id)
+      sub_results.append({"ObjectType": "bulk.ApiResult", "Status": status, "Body": sub_result_body})
+    return 200, dict(body, ObjectType="bulk.Request", Results=sub_results)
+
+  def create_handler(self):
+    mock_server = self
+
+    class MockIntersightRequestHandler(BaseHTTPRequestHandler):
+      protocol_version = "HTTP/1.1"
+      # The headers and body are written separately, so Nagle's algorithm would hold the body of each response on a
+      # kept alive connection until the delayed ACK of the client
+      disable_nagle_algorithm = True
+
+      def log_message(self,format,*args):
+        pass
+
+      def handle_method(self):
+        split_path = urlsplit(self.path)
+        query = dict(parse_qsl(split_path.query))
+        content_length = int(self.headers.get("Content-Length") or 0)
+        request_body = self.rfile.read(content_length) if content_length else b""
+        api_key_id_match = re.search(r'keyId="([^"]*)"', self.headers.get("Authorization") or "")
+        api_key_id = api_key_id_match.group(1) if api_key_id_match else ""
+        delay = mock_server.latency + random.uniform(0, mock_server.latency_jitter)
+        if delay:
+          time.sleep(delay)
+        headers = {}
+        injected_failure = mock_server.inject_failure()
+        if injected_failure:
+          status, headers = injected_failure
+          response_body = {"code": "Injected", "message": "An injected failure with the status code " + str(status) + "."}
+        else:
+          try:
+            status, response_body = mock_server.handle_request(self.command, split_path.path, query, json.loads(request_body) if request_body else {}, api_key_id)
+          except ValueError as exception_message:
+            status, response_body = 400, {"code": "BadRequest", "message": str(exception_message)}
+        response_data = json.dumps(response_body).encode("utf-8")
+        if self.command == "GET" and status == 200:
+          headers["ETag"] = '"' + hashlib.md5(response_data).hexdigest() + '"'
+          if self.headers.get("If-None-Match") == headers["ETag"]:
+            status, response_data = 304, b""
+        mock_server.count_request(self.command, status)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if status != 304:
+          self.send_header("Content-Length", str(len(response_data)))
+        for header_name, header_value in headers.items():
+          self.send_header(header_name, header_value)
+        self.end_headers()
+        self.wfile.write(response_data)
+
+      do_GET = handle_method
+      do_POST = handle_method
+      do_PATCH = handle_method
+      do_DELETE = handle_method
+
+    return MockIntersightRequestHandler
+
+
+class MockSMTPServer(object):
+  """A local SMTP server that accepts and keeps the email alerts of the HyperFlex Edge Policy Maker script. Only
+  the commands used by smtplib to send mail are supported.
+
+  Attributes:
+    messages: A list of the received messages, each a dictionary containing the sender, the recipients and the
+      message data.
+    connections: The number of SMTP connections that have been accepted.
+    port: The port the mock SMTP server is listening on.
+  """
+
+  def __init__(self,host="127.0.0.1",port=0):
+    self.lock = threading.Lock()
+    self.messages = []
+    self.connections = 0
+    self.tcp_server = socketserver.ThreadingTCPServer((host, port), self.create_handler())
+    self.tcp_server.daemon_threads = True
+    self.port = self.tcp_server.server_address[1]
+    self.server_thread = None
+
+  def start(self):
+    """Starts serving SMTP connections on a background thread and returns the mock SMTP server."""
+    self.server_thread = threading.Thread(target=self.tcp_server.serve_forever, args=(mock_poll_interval,), daemon=True)
+    self.server_thread.start()
+    return self
+
+  def stop(self):
+    """Stops serving SMTP connections and closes the listening socket."""
+    self.tcp_server.shutdown()
+    self.tcp_server.server_close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self,exc_type,exc_value,traceback):
+    self.stop()
+
+  def create_handler(self):
+    mock_smtp_server = self
+
+    class MockSMTPRequestHandler(socketserver.StreamRequestHandler):
+
+      def reply(self,line):
+        self.wfile.write((line + "\r\n").encode("ascii"))
+
+      def handle(self):
+        with mock_smtp_server.lock:
+          mock_smtp_server.connections += 1
+        self.reply("220 mock-smtp ready")
+        mail_from, recipients = None, []
+        for command_line in self.rfile:
+          command = command_line.decode("utf-8", "replace").rstrip("\r\n")
+          verb = command.split(" ", 1)[0].upper()
+          if verb in ("EHLO", "HELO"):
+            self.reply("250 mock-smtp")
+          elif verb == "MAIL":
+            mail_from, recipients = command.split(":", 1)[1].strip(), []
+            self.reply("250 OK")
+          elif verb == "RCPT":
+            recipients.append(command.split(":", 1)[1].strip())
+            self.reply("250 OK")
+          elif verb == "DATA":
+            self.reply("354 End data with <CR><LF>.<CR><LF>")
+            data_lines = []
+            for data_line in self.rfile:
+              if data_line in (b".\r\n", b".\n"):
+                break
+              data_lines.append(data_line[1:] if data_line.startswith(b"..") else data_line)
+            with mock_smtp_server.lock:
+              mock_smtp_server.messages.append({"sender": mail_from, "recipients": recipients, "data": b"".join(data_lines).decode("utf-8", "replace")})
+            self.reply("250 OK")
+          elif verb in ("RSET", "NOOP"):
+            self.reply("250 OK")
+          elif verb == "QUIT":
+            self.reply("221 Bye")
+            return
+          else:
+            self.reply("502 Command not implemented")
+
+    return MockSMTPRequestHandler
+
+
+if __name__ == "__main__":
+  argument_parser = argparse.ArgumentParser(description="Run a local mock Intersight API server.")
+  argument_parser.add_argument("--host", default="127.0.0.1", help="The address to listen on. The default value is 127.0.0.1.")
+  argument_parser.add_argument("--port", type=int, default=8080, help="The port to listen on. The default value is 8080.")
+  argument_parser.add_argument("--latency", type=float, default=0.0, help="The number of seconds added to every response.")
+  argument_parser.add_argument("--latency-jitter", type=float, default=0.0, help="The maximum number of random seconds added to the latency.")
+  argument_parser.add_argument("--error-rate", type=float, default=0.0, help="The fraction of requests that fail with a 503 error.")
+  argument_parser.add_argument("--throttle-rate", type=int, default=0, help="The number of requests per second allowed before 429 errors are returned.")
+  argument_parser.add_argument("--smtp-port", type=int, help="An optional port for a mock SMTP server that accepts the email alerts.")
+  script_arguments = argument_parser.parse_args()
+  mock_server = MockIntersightServer(script_arguments.host, script_arguments.port, script_arguments.latency, script_arguments.latency_jitter, script_arguments.error_rate, script_arguments.throttle_rate)
+  if script_arguments.smtp_port is not None:
+    mock_smtp_server = MockSMTPServer(script_arguments.host, script_arguments.smtp_port).start()
+    print("Serving the mock SMTP server at " + script_arguments.host + ":" + str(mock_smtp_server.port))
+  print("Serving the mock Intersight API at " + mock_server.url)
+  try:
+    mock_server.http_server.serve_forever()
+  except KeyboardInterrupt:
+    mock_server.http_server.server_close()
+    sys.exit(0)
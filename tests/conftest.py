@@ -0,0 +1,81 @@
+"""
+Shared pytest configuration and fixtures for the HyperFlex Edge Policy Maker tests.
+The scripts are not installed as a package, so the repository directory is added to the module search path.
+"""
+
+# Import needed Python modules
+import os
+import sys
+import json
+import urllib.parse
+import pytest
+import urllib3
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import hx_policy_maker
+from mock_intersight_server import MockIntersightServer
+
+
+class MockApiException(Exception):
+  """A stand-in for the ApiException of the Intersight SDK for Python, carrying the status code, reason, headers and
+  body of a failed response."""
+
+  def __init__(self,response):
+    self.status = response.status
+    self.reason = response.reason
+    self.headers = response.headers
+    self.body = response.data
+    response.release_conn()
+    Exception.__init__(self, "(" + str(self.status) + ")\nReason: " + str(self.reason) + "\nHTTP response body: " + self.body.decode("utf-8", "replace"))
+
+
+class MockApiClient(object):
+  """A stand-in for the IntersightApiClient of the Intersight SDK for Python that follows the contract of its call_api
+  method, sending requests to the mock Intersight server over a urllib3 connection pool. Requests are not signed, but
+  carry the API key ID in the Authorization header so that the mock Intersight server selects the account. The pool
+  keeps a single keep-alive connection, which every request reuses.
+
+  Attributes:
+    host: The base URL of the Intersight API.
+    api_key_id: The Intersight API key ID.
+  """
+
+  def __init__(self,host,api_key_id):
+    self.host = host
+    self.api_key_id = api_key_id
+    self.pool_manager = urllib3.PoolManager(maxsize=1, retries=False)
+
+  def call_api(self,resource_path,method,query_params=None,header_params=None,body=None,_return_http_data_only=None,_preload_content=True,**kwargs):
+    url = self.host + resource_path
+    if query_params:
+      url += "?" + urllib.parse.urlencode(query_params)
+    headers = dict(header_params or {}, Authorization="Signature keyId=\"" + self.api_key_id + "\"")
+    request_body = None
+    if body is not None:
+      headers["Content-Type"] = "application/json"
+      request_body = json.dumps(body)
+    response = self.pool_manager.request(method, url, body=request_body, headers=headers, preload_content=False)
+    if not 200 <= response.status <= 299:
+      raise MockApiException(response)
+    if not _preload_content:
+      return response
+    data = json.loads(response.data)
+    response.release_conn()
+    return data if _return_http_data_only else (data, response.status, response.headers)
+
+
+@pytest.fixture
+def mock_server(monkeypatch):
+  """A running mock Intersight server, with the request scheduler rate limit and the availability test cache of the
+  HyperFlex Edge Policy Maker cleared."""
+  monkeypatch.setattr(hx_policy_maker.request_scheduler, "rate", 0)
+  hx_policy_maker.availability_cache.clear()
+  with MockIntersightServer() as mock_intersight_server:
+    yield mock_intersight_server
+
+
+@pytest.fixture
+def api_client(mock_server):
+  """An Intersight API client stand-in for an account of the mock Intersight server."""
+  return MockApiClient(mock_server.url, "test-key")
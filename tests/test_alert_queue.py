@@ -0,0 +1,78 @@
+"""
+Tests for the email alert queue of the HyperFlex Edge Policy Maker, using the mock SMTP server.
+"""
+
+# Import needed Python modules
+import socket
+import pytest
+import hx_policy_maker
+from hx_policy_maker import AlertQueue
+from mock_intersight_server import MockSMTPServer
+
+
+def create_alert_session(account_name,session_id):
+  """This is a function to create the dCloud session details of an email alert.
+
+  Args:
+    account_name: The name of the Intersight service account.
+    session_id: The dCloud session ID.
+
+  Returns:
+    A dictionary of dCloud session details.
+  """
+  return {
+    "intersight_account_name": account_name,
+    "intersight_account_service_type": "test",
+    "intersight_account_email": "test@example.com",
+    "intersight_account_cluster": "Cluster " + account_name,
+    "intersight_account_session": session_id,
+    "intersight_account_location": "RTP",
+    "session_xml_path": None,
+    "cluster_xml_path": None
+  }
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+  with MockSMTPServer() as mock_smtp_server:
+    monkeypatch.setattr(hx_policy_maker, "smtp_server", "127.0.0.1")
+    monkeypatch.setattr(hx_policy_maker, "smtp_port", mock_smtp_server.port)
+    monkeypatch.setattr(hx_policy_maker, "smtp_timeout", 5)
+    yield mock_smtp_server
+
+
+def test_alerts_within_the_digest_window_are_sent_as_one_email(smtp_server):
+  alert_queue = AlertQueue(digest_window=0.2, suppression_window=60, idle_timeout=5)
+  alert_queue.put(create_alert_session("account-1", "100001"))
+  alert_queue.put(create_alert_session("account-1", "100002"))
+  alert_queue.put(create_alert_session("account-2", "100003"))
+  alert_queue.stop(10)
+  assert len(smtp_server.messages) == 1
+  assert smtp_server.connections == 1
+  message_data = smtp_server.messages[0]["data"]
+  assert "2 Intersight Service Accounts are Unavailable" in message_data
+  assert alert_queue.get_stats() == {"queued": 3, "merged": 1, "suppressed": 0, "sent": 3, "emails": 1, "failures": 0}
+
+
+def test_recently_alerted_accounts_are_suppressed(smtp_server):
+  alert_queue = AlertQueue(digest_window=0.05, suppression_window=60, idle_timeout=5)
+  alert_queue.send_digest([(0, create_alert_session("account-1", "100001"))])
+  alert_queue.send_digest([(0, create_alert_session("account-1", "100002")), (0, create_alert_session("account-2", "100003"))])
+  alert_queue.close_connection()
+  assert len(smtp_server.messages) == 2
+  assert smtp_server.connections == 1
+  assert "Account account-2 is Unavailable" in smtp_server.messages[1]["data"]
+  assert alert_queue.get_stats()["suppressed"] == 1
+
+
+def test_unreachable_smtp_server_counts_a_failure(monkeypatch):
+  with socket.socket() as unused_socket:
+    unused_socket.bind(("127.0.0.1", 0))
+    unused_port = unused_socket.getsockname()[1]
+  monkeypatch.setattr(hx_policy_maker, "smtp_server", "127.0.0.1")
+  monkeypatch.setattr(hx_policy_maker, "smtp_port", unused_port)
+  monkeypatch.setattr(hx_policy_maker, "smtp_timeout", 1)
+  alert_queue = AlertQueue(digest_window=0.05, suppression_window=60, idle_timeout=5)
+  alert_queue.send_digest([(0, create_alert_session("account-1", "100001"))])
+  assert alert_queue.get_stats()["failures"] == 1
+  assert alert_queue.get_stats()["emails"] == 0
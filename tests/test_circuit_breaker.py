@@ -0,0 +1,43 @@
+"""
+Tests for the Intersight API circuit breaker of the HyperFlex Edge Policy Maker.
+"""
+
+# Import needed Python modules
+import time
+from hx_policy_maker import CircuitBreaker
+
+
+def test_circuit_opens_at_the_failure_threshold():
+  circuit_breaker = CircuitBreaker(3, 60)
+  for failure_number in range(2):
+    circuit_breaker.record_failure()
+    assert circuit_breaker.allow()
+  circuit_breaker.record_failure()
+  assert not circuit_breaker.allow()
+  assert circuit_breaker.get_stats() == {"opened": 1, "rejected": 1, "state": "open"}
+
+
+def test_success_resets_the_failure_count():
+  circuit_breaker = CircuitBreaker(3, 60)
+  circuit_breaker.record_failure()
+  circuit_breaker.record_failure()
+  circuit_breaker.record_success()
+  circuit_breaker.record_failure()
+  circuit_breaker.record_failure()
+  assert circuit_breaker.allow()
+
+
+def test_one_trial_call_after_the_reset_timeout():
+  circuit_breaker = CircuitBreaker(1, 0.05)
+  circuit_breaker.record_failure()
+  assert not circuit_breaker.allow()
+  time.sleep(0.06)
+  assert circuit_breaker.allow()
+  assert not circuit_breaker.allow()
+  circuit_breaker.record_failure()
+  assert not circuit_breaker.allow()
+  time.sleep(0.06)
+  assert circuit_breaker.allow()
+  circuit_breaker.record_success()
+  assert circuit_breaker.allow()
+  assert circuit_breaker.get_stats()["state"] == "closed"
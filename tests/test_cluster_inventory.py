@@ -0,0 +1,106 @@
+"""
+Tests for the cluster inventory of the HyperFlex Edge Policy Maker.
+"""
+
+# Import needed Python modules
+import os
+import pytest
+import hx_policy_maker
+
+
+def write_cluster_xml(clusters_directory,datacenter_name,cluster_name,account_name):
+  """This is a function to write a cluster.xml file in the layout of the clusters directory.
+
+  Args:
+    clusters_directory: The path to the clusters directory.
+    datacenter_name: The name of the datacenter of the cluster.
+    cluster_name: The name of the cluster.
+    account_name: The name of the Intersight account of the cluster.
+
+  Returns:
+    The path to the written cluster.xml file.
+  """
+  cluster_xml_directory = os.path.join(clusters_directory, datacenter_name, cluster_name, "XML_File")
+  os.makedirs(cluster_xml_directory, exist_ok=True)
+  cluster_xml_path = os.path.join(cluster_xml_directory, "cluster.xml")
+  with open(cluster_xml_path, "w") as cluster_xml:
+    cluster_xml.write("<cluster><platform_name>" + cluster_name + "</platform_name><datacenter>" + datacenter_name + "</datacenter>"
+      "<account><intersight_account>" + account_name + "</intersight_account><service_account_type>demo</service_account_type>"
+      "<cisco_account><email>demo@example.com</email></cisco_account>"
+      "<api_keys><key01><api_key_id>key-" + account_name + "</api_key_id></key01></api_keys></account></cluster>")
+  return cluster_xml_path
+
+
+@pytest.fixture
+def clusters_directory(tmp_path, monkeypatch):
+  monkeypatch.setattr(hx_policy_maker, "cluster_inventory_cache_file", str(tmp_path / "cluster_inventory_cache.json"))
+  monkeypatch.setattr(hx_policy_maker, "cluster_inventories", {})
+  return str(tmp_path / "Clusters")
+
+
+@pytest.fixture
+def parsed_files(monkeypatch):
+  parsed_files = []
+  parse_cluster_xml = hx_policy_maker.parse_cluster_xml
+
+  def counting_parse_cluster_xml(cluster_xml_path):
+    parsed_files.append(os.path.basename(os.path.dirname(os.path.dirname(cluster_xml_path))))
+    return parse_cluster_xml(cluster_xml_path)
+
+  monkeypatch.setattr(hx_policy_maker, "parse_cluster_xml", counting_parse_cluster_xml)
+  return parsed_files
+
+
+def test_parse_cluster_xml(tmp_path):
+  cluster_xml_path = write_cluster_xml(str(tmp_path), "RTP", "Cluster 1", "account-1")
+  assert hx_policy_maker.parse_cluster_xml(cluster_xml_path) == {
+    "intersight_account_name": "account-1",
+    "intersight_account_email": "demo@example.com",
+    "intersight_account_cluster": "Cluster 1",
+    "intersight_account_service_type": "demo",
+    "intersight_account_location": "RTP",
+    "key_id": "key-account-1"
+  }
+  with open(cluster_xml_path, "w") as cluster_xml:
+    cluster_xml.write("<cluster><platform_name>Cluster 1</platform_name></cluster>")
+  cluster_details = hx_policy_maker.parse_cluster_xml(cluster_xml_path)
+  assert cluster_details["intersight_account_cluster"] == "Cluster 1"
+  assert cluster_details["key_id"] is None
+
+
+def test_find_cluster_only_parses_changed_files(clusters_directory, parsed_files):
+  write_cluster_xml(clusters_directory, "RTP", "Cluster 1", "account-1")
+  write_cluster_xml(clusters_directory, "RTP", "Cluster 2", "account-2")
+  assert hx_policy_maker.find_cluster(clusters_directory, "RTP", "Cluster 1")["intersight_account_name"] == "account-1"
+  assert sorted(parsed_files) == ["Cluster 1", "Cluster 2"]
+  assert hx_policy_maker.find_cluster(clusters_directory, "RTP", "Cluster 2")["intersight_account_name"] == "account-2"
+  assert len(parsed_files) == 2
+
+  # A modified cluster.xml file is parsed again, without scanning the other clusters
+  write_cluster_xml(clusters_directory, "RTP", "Cluster 1", "account-1-renamed")
+  assert hx_policy_maker.find_cluster(clusters_directory, "RTP", "Cluster 1")["intersight_account_name"] == "account-1-renamed"
+  assert parsed_files[2:] == ["Cluster 1"]
+
+
+def test_find_cluster_rescans_for_a_new_cluster(clusters_directory, parsed_files):
+  write_cluster_xml(clusters_directory, "RTP", "Cluster 1", "account-1")
+  hx_policy_maker.find_cluster(clusters_directory, "RTP", "Cluster 1")
+  write_cluster_xml(clusters_directory, "LON", "Cluster 3", "account-3")
+  assert hx_policy_maker.find_cluster(clusters_directory, "LON", "Cluster 3")["intersight_account_location"] == "LON"
+  assert parsed_files == ["Cluster 1", "Cluster 3"]
+  with pytest.raises(KeyError):
+    hx_policy_maker.find_cluster(clusters_directory, "LON", "Cluster 4")
+
+
+def test_inventory_cache_file_is_reused_by_a_new_process(clusters_directory, parsed_files, monkeypatch):
+  write_cluster_xml(clusters_directory, "RTP", "Cluster 1", "account-1")
+  hx_policy_maker.find_cluster(clusters_directory, "RTP", "Cluster 1")
+  monkeypatch.setattr(hx_policy_maker, "cluster_inventories", {})
+  assert hx_policy_maker.find_cluster(clusters_directory, "RTP", "Cluster 1")["intersight_account_name"] == "account-1"
+  assert parsed_files == ["Cluster 1"]
+
+  # A cluster.xml file modified between processes is parsed again
+  write_cluster_xml(clusters_directory, "RTP", "Cluster 1", "account-1-renamed")
+  monkeypatch.setattr(hx_policy_maker, "cluster_inventories", {})
+  assert hx_policy_maker.find_cluster(clusters_directory, "RTP", "Cluster 1")["intersight_account_name"] == "account-1-renamed"
+  assert parsed_files == ["Cluster 1", "Cluster 1"]
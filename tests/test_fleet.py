@@ -0,0 +1,20 @@
+"""
+Tests for the fleet mode of the HyperFlex Edge Policy Maker.
+"""
+
+# Import needed Python modules
+import logging
+import pytest
+import hx_policy_maker
+
+
+@pytest.mark.parametrize("teardown,summary_text", [(False, "(0 of 6 policies in place)"), (True, "(0 of 0 policies deleted)")])
+def test_summary_of_a_session_that_fails_to_load_matches_the_run_mode(tmp_path, monkeypatch, caplog, teardown, summary_text):
+  monkeypatch.setattr(hx_policy_maker, "cluster_inventory_cache_file", str(tmp_path / "cluster_inventory_cache.json"))
+  monkeypatch.setattr(hx_policy_maker, "cluster_inventories", {})
+  session_xml_path = tmp_path / "session.xml"
+  session_xml_path.write_text("<session><id>900001</id><datacenter>RTP</datacenter><devices><device><name>Missing Cluster</name></device></devices></session>")
+  with caplog.at_level(logging.INFO):
+    fleet_results = hx_policy_maker.run_fleet([str(session_xml_path)], clusters_directory=str(tmp_path / "Clusters"), teardown=teardown)
+  assert [fleet_result["status"] for fleet_result in fleet_results] == ["failed"]
+  assert str(session_xml_path) + ": failed " + summary_text in caplog.text
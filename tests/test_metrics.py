@@ -0,0 +1,34 @@
+"""
+Tests for the metrics of the HyperFlex Edge Policy Maker.
+"""
+
+# Import needed Python modules
+import sys
+import types
+import hx_policy_maker
+
+
+class MockSigner(object):
+  def __init__(self,key):
+    self.key = key
+
+  def sign(self,message_hash):
+    return b"signature-" + message_hash
+
+
+def test_request_signing_is_timed_as_its_own_phase(monkeypatch):
+  sdk_module = types.ModuleType("intersight.intersight_api_client")
+  sdk_module.IntersightApiClient = type("IntersightApiClient", (object,), {"__module__": sdk_module.__name__})
+  sdk_module.PKCS1_v1_5 = types.ModuleType("Crypto.Signature.PKCS1_v1_5")
+  sdk_module.PKCS1_v1_5.new = MockSigner
+  monkeypatch.setitem(sys.modules, "intersight", types.ModuleType("intersight"))
+  monkeypatch.setitem(sys.modules, sdk_module.__name__, sdk_module)
+  hx_policy_maker.reset_metrics()
+  hx_policy_maker.enable_signing_metrics()
+  hx_policy_maker.enable_signing_metrics()
+  signer = sdk_module.PKCS1_v1_5.new("private-key")
+  assert signer.key == "private-key"
+  assert signer.sign(b"digest") == b"signature-digest"
+  signing_phases = [phase for phase in hx_policy_maker.get_metrics_summary()["phase"] if phase["phase"] == "request_signing"]
+  assert [(signing_phase["count"], signing_phase["statuses"]) for signing_phase in signing_phases] == [(1, {"ok": 1})]
+  hx_policy_maker.reset_metrics()
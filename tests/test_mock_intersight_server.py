@@ -0,0 +1,79 @@
+"""
+Tests for the mock Intersight server, and for provisioning and tearing down the HyperFlex policies of a dCloud
+session against it.
+"""
+
+# Import needed Python modules
+import json
+import urllib.request
+import pytest
+import hx_policy_maker
+from mock_intersight_server import MockIntersightServer, filter_matches, get_object_type
+
+
+def test_filter_eq():
+  assert filter_matches("Name eq 'sample-policy'", {"Name": "sample-policy"})
+  assert not filter_matches("Name eq 'sample-policy'", {"Name": "other-policy"})
+
+
+def test_filter_in():
+  assert filter_matches("Name in ('a','b')", {"Name": "b"})
+  assert not filter_matches("Name in ('a','b')", {"Name": "c"})
+
+
+def test_filter_startswith():
+  assert filter_matches("startswith(Name,'sample-')", {"Name": "sample-policy"})
+  assert not filter_matches("startswith(Name,'sample-')", {"Name": "policy-sample"})
+
+
+def test_filter_escaped_quotes_and_and():
+  mock_object = {"Name": "o'brien", "Description": "test"}
+  assert filter_matches("Name eq 'o''brien' and Description eq 'test'", mock_object)
+  assert not filter_matches("Name eq 'o''brien' and Description eq 'other'", mock_object)
+
+
+def test_filter_unsupported_condition():
+  with pytest.raises(ValueError):
+    filter_matches("Name ne 'sample-policy'", {"Name": "sample-policy"})
+
+
+def test_get_object_type():
+  assert get_object_type("hyperflex/SysConfigPolicies") == "hyperflex.SysConfigPolicy"
+  assert get_object_type("iam/Accounts") == "iam.Account"
+
+
+def test_mock_server_serves_filtered_objects():
+  with MockIntersightServer() as mock_server:
+    for policy_name in ("sample-a", "sample-b", "other"):
+      request = urllib.request.Request(mock_server.url + "/hyperflex/SysConfigPolicies", data=json.dumps({"Name": policy_name}).encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST")
+      urllib.request.urlopen(request).close()
+    with urllib.request.urlopen(mock_server.url + "/hyperflex/SysConfigPolicies?$filter=" + urllib.request.quote("startswith(Name,'sample-')")) as response:
+      results = json.loads(response.read())["Results"]
+  assert sorted(result["Name"] for result in results) == ["sample-a", "sample-b"]
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+  monkeypatch.setattr(hx_policy_maker, "range_allocation_file", str(tmp_path / "range_allocations.json"))
+  for allocator, parse_value, format_value in hx_policy_maker.range_allocators.values():
+    allocator.reset()
+  yield {
+    "intersight_account_name": "test-account",
+    "intersight_account_session": "100001",
+    "cluster_name": "Cluster 1",
+    "datacenter_name": "RTP"
+  }
+  for allocator, parse_value, format_value in hx_policy_maker.range_allocators.values():
+    allocator.reset()
+
+
+def test_provision_reconcile_and_teardown(mock_server, api_client, session):
+  assert hx_policy_maker.provision_session(session, api_client)["status"] == "completed"
+  write_request_count = sum(request_count for request_key, request_count in mock_server.get_stats().items() if request_key.startswith(("POST", "PATCH")))
+  session_result = hx_policy_maker.provision_session(session, api_client, reconcile=True)
+  assert set(session_result["policy_results"].values()) == {"No changes were needed."}
+  assert sum(request_count for request_key, request_count in mock_server.get_stats().items() if request_key.startswith(("POST", "PATCH"))) == write_request_count
+  session_result = hx_policy_maker.teardown_session(session, api_client)
+  assert session_result["status"] == "completed"
+  assert len(session_result["teardown_results"]) == len(hx_policy_maker.hyperflex_policy_requests)
+  assert not list(hx_policy_maker.iu_get_paged("hyperflex/SysConfigPolicies", api_client=api_client))
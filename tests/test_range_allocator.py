@@ -0,0 +1,80 @@
+"""
+Tests for the IP address and MAC address prefix range allocators of the HyperFlex Edge Policy Maker.
+"""
+
+# Import needed Python modules
+import json
+import pytest
+import hx_policy_maker
+from hx_policy_maker import RangeAllocator
+
+
+def test_allocate_returns_consecutive_ranges():
+  allocator = RangeAllocator(100, 199)
+  assert allocator.allocate("cluster-1/mgmt", 2) == (100, 101)
+  assert allocator.allocate("cluster-1/hxdp", 2) == (102, 103)
+  assert allocator.allocate("cluster-2/mgmt", 2) == (104, 105)
+
+
+def test_allocate_keeps_the_range_of_an_owner():
+  allocator = RangeAllocator(100, 199)
+  first_range = allocator.allocate("cluster-1/mgmt", 2)
+  allocator.allocate("cluster-2/mgmt", 2)
+  assert allocator.allocate("cluster-1/mgmt", 2) == first_range
+
+
+def test_allocate_skips_reserved_ranges():
+  allocator = RangeAllocator(100, 199)
+  assert allocator.reserve("existing-policy", 100, 103)
+  assert allocator.allocate("cluster-1/mgmt", 2) == (104, 105)
+
+
+def test_reserve_rejects_overlapping_ranges():
+  allocator = RangeAllocator(100, 199)
+  assert allocator.reserve("cluster-1/mgmt", 100, 103)
+  assert not allocator.reserve("cluster-2/mgmt", 103, 104)
+  assert allocator.reserve("cluster-1/mgmt", 100, 103)
+
+
+def test_allocate_reuses_released_ranges_after_wrapping():
+  allocator = RangeAllocator(100, 105)
+  allocator.allocate("cluster-1/mgmt", 2)
+  allocator.allocate("cluster-2/mgmt", 2)
+  allocator.allocate("cluster-3/mgmt", 2)
+  allocator.release("cluster-2/mgmt")
+  assert allocator.allocate("cluster-4/mgmt", 2) == (102, 103)
+
+
+def test_allocate_raises_when_the_pool_is_full():
+  allocator = RangeAllocator(100, 103)
+  allocator.allocate("cluster-1/mgmt", 2)
+  allocator.allocate("cluster-2/mgmt", 2)
+  with pytest.raises(ValueError):
+    allocator.allocate("cluster-3/mgmt", 2)
+
+
+def test_version_counts_changes():
+  allocator = RangeAllocator(100, 199)
+  allocator.allocate("cluster-1/mgmt", 2)
+  version = allocator.version
+  allocator.allocate("cluster-1/mgmt", 2)
+  assert allocator.version == version
+  allocator.reset()
+  assert allocator.version > version
+  assert allocator.get_allocations() == {}
+  assert allocator.allocate("cluster-2/mgmt", 2) == (100, 101)
+
+
+def test_new_allocations_are_saved_right_away(tmp_path, monkeypatch):
+  allocation_file = str(tmp_path / "range_allocations.json")
+  monkeypatch.setattr(hx_policy_maker, "range_allocation_file", allocation_file)
+  monkeypatch.setattr(hx_policy_maker, "seed_range_allocations", lambda session, api_client=None: None)
+  for allocator, parse_value, format_value in hx_policy_maker.range_allocators.values():
+    allocator.reset()
+  hx_policy_maker.get_hyperflex_policy_requests({"datacenter_name": "RTP", "cluster_name": "Cluster 1"})
+  with open(allocation_file) as allocation_input:
+    saved_allocations = json.load(allocation_input)
+  assert saved_allocations["ip_addresses"]["RTP/Cluster 1/mgmt"] == ["198.18.135.101", "198.18.135.102"]
+  assert saved_allocations["mac_prefixes"]["RTP/Cluster 1/mac"] == ["00:25:B5:00", "00:25:B5:00"]
+  for allocator, parse_value, format_value in hx_policy_maker.range_allocators.values():
+    allocator.reset()
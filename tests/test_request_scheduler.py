@@ -0,0 +1,146 @@
+"""
+Tests for the Intersight API request scheduler of the HyperFlex Edge Policy Maker.
+"""
+
+# Import needed Python modules
+import datetime
+import time
+import email.utils
+import pytest
+import urllib3
+from hx_policy_maker import RequestScheduler
+
+
+class StatusError(Exception):
+  """An API error with the status code and headers of a failed Intersight API call."""
+
+  def __init__(self,status,headers=None):
+    Exception.__init__(self, "(" + str(status) + ")")
+    self.status = status
+    self.headers = headers or {}
+
+
+def create_failing_function(errors,result="done"):
+  """This is a function to create a function that raises the provided errors in order, then returns a result.
+
+  Args:
+    errors: A list of the exceptions to be raised by the first calls.
+    result: The value returned once all exceptions have been raised. The default value is "done".
+
+  Returns:
+    The created function. The number of calls made is kept in its call_count attribute.
+  """
+  remaining_errors = list(errors)
+
+  def failing_function():
+    failing_function.call_count += 1
+    if remaining_errors:
+      raise remaining_errors.pop(0)
+    return result
+
+  failing_function.call_count = 0
+  return failing_function
+
+
+def create_scheduler(max_retries=3):
+  return RequestScheduler(0, 1, max_retries, 0.001, 1)
+
+
+def test_get_is_retried_until_it_succeeds():
+  request_scheduler = create_scheduler()
+  failing_function = create_failing_function([StatusError(503), StatusError(502), urllib3.exceptions.ReadTimeoutError(None, "/", "timed out")])
+  assert request_scheduler.call("GET", failing_function) == "done"
+  assert failing_function.call_count == 4
+  assert request_scheduler.get_stats()["retries"] == 3
+  assert request_scheduler.get_stats()["failures"] == 0
+
+
+def test_retries_stop_at_max_retries():
+  request_scheduler = create_scheduler(max_retries=3)
+  failing_function = create_failing_function([StatusError(503)] * 5)
+  with pytest.raises(StatusError):
+    request_scheduler.call("GET", failing_function)
+  assert failing_function.call_count == 4
+  failing_function = create_failing_function([StatusError(503)] * 5)
+  with pytest.raises(StatusError):
+    request_scheduler.call("GET", failing_function, max_retries=1)
+  assert failing_function.call_count == 2
+  assert request_scheduler.get_stats()["failures"] == 2
+
+
+@pytest.mark.parametrize("status", [400, 404, 409])
+def test_client_errors_are_not_retried(status):
+  request_scheduler = create_scheduler()
+  failing_function = create_failing_function([StatusError(status)])
+  with pytest.raises(StatusError):
+    request_scheduler.call("GET", failing_function)
+  assert failing_function.call_count == 1
+
+
+@pytest.mark.parametrize("error", [
+  StatusError(429),
+  StatusError(503),
+  urllib3.exceptions.NewConnectionError(None, "connection refused"),
+  urllib3.exceptions.MaxRetryError(None, "/", reason=urllib3.exceptions.NewConnectionError(None, "connection refused"))
+])
+def test_post_is_retried_on_throttling_unavailability_and_connection_errors(error):
+  request_scheduler = create_scheduler()
+  failing_function = create_failing_function([error])
+  assert request_scheduler.call("POST", failing_function) == "done"
+  assert failing_function.call_count == 2
+
+
+@pytest.mark.parametrize("error", [
+  StatusError(500),
+  StatusError(502),
+  StatusError(504),
+  urllib3.exceptions.ReadTimeoutError(None, "/", "timed out"),
+  urllib3.exceptions.ProtocolError("connection aborted")
+])
+def test_post_is_not_retried_when_it_may_have_been_applied(error):
+  request_scheduler = create_scheduler()
+  failing_function = create_failing_function([error])
+  with pytest.raises(type(error)):
+    request_scheduler.call("POST", failing_function)
+  assert failing_function.call_count == 1
+  assert request_scheduler.call("GET", create_failing_function([error])) == "done"
+
+
+def test_retry_after_overrides_the_backoff():
+  request_scheduler = RequestScheduler(0, 1, 3, 0.001, 60)
+  assert request_scheduler.retry_delay(0, StatusError(503, {"Retry-After": "2"})) == 2.0
+  assert request_scheduler.retry_delay(0, StatusError(503, {"Retry-After": "120"})) == 60
+  retry_after_date = email.utils.format_datetime(datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=30), usegmt=True)
+  assert 28 <= request_scheduler.retry_delay(0, StatusError(503, {"Retry-After": retry_after_date})) <= 30
+  retry_after_date = email.utils.format_datetime(datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(seconds=30), usegmt=True)
+  assert request_scheduler.retry_delay(0, StatusError(503, {"Retry-After": retry_after_date})) == 0.0
+  assert 0 <= request_scheduler.retry_delay(0, StatusError(503, {"Retry-After": "soon"})) <= 0.001
+  assert 0 <= request_scheduler.retry_delay(2, StatusError(503)) <= 0.004
+
+
+def test_throttling_pauses_only_its_own_bucket():
+  request_scheduler = create_scheduler()
+  failing_function = create_failing_function([StatusError(429, {"Retry-After": "0.2"})])
+  start_time = time.monotonic()
+  assert request_scheduler.call("GET", failing_function, bucket_key="account-1") == "done"
+  assert time.monotonic() - start_time >= 0.2
+  assert request_scheduler.get_stats()["throttled"] == 1
+
+  # Calls to another account are not paused by the throttling of the first account
+  request_scheduler.get_bucket("account-1")["paused_until"] = time.monotonic() + 0.2
+  start_time = time.monotonic()
+  assert request_scheduler.call("GET", create_failing_function([]), bucket_key="account-2") == "done"
+  assert time.monotonic() - start_time < 0.1
+  start_time = time.monotonic()
+  assert request_scheduler.call("GET", create_failing_function([]), bucket_key="account-1") == "done"
+  assert time.monotonic() - start_time >= 0.15
+
+
+def test_rate_limit_paces_each_bucket():
+  request_scheduler = RequestScheduler(20, 1, 0, 0.001, 1)
+  start_time = time.monotonic()
+  for call_number in range(3):
+    request_scheduler.call("GET", create_failing_function([]), bucket_key="account-1")
+  request_scheduler.call("GET", create_failing_function([]), bucket_key="account-2")
+  elapsed_time = time.monotonic() - start_time
+  assert 0.09 <= elapsed_time < 0.5
@@ -0,0 +1,97 @@
+"""
+Tests for the Intersight API response cache of the HyperFlex Edge Policy Maker.
+"""
+
+# Import needed Python modules
+import types
+import pytest
+import hx_policy_maker
+from hx_policy_maker import ResponseCache
+
+
+def test_least_recently_used_entries_are_evicted():
+  response_cache = ResponseCache(3, 1000, 60)
+  for cache_key in ("a", "b", "c"):
+    response_cache.store(cache_key, b"data")
+  assert response_cache.get("a") is not None
+  response_cache.store("d", b"data")
+  assert list(response_cache.entries) == ["c", "a", "d"]
+  assert response_cache.get("b") is None
+  assert response_cache.get_stats()["evictions"] == 1
+
+
+def test_total_size_is_limited():
+  response_cache = ResponseCache(10, 10, 60)
+  response_cache.store("a", b"1234")
+  response_cache.store("b", b"1234")
+  response_cache.store("c", b"1234")
+  assert list(response_cache.entries) == ["b", "c"]
+  assert response_cache.get_stats()["bytes"] == 8
+
+  # A response larger than the cache is not stored, and replacing an entry does not count it twice
+  response_cache.store("d", b"12345678901")
+  assert response_cache.get("d") is None
+  response_cache.store("c", b"1234567")
+  assert list(response_cache.entries) == ["c"]
+  assert response_cache.get_stats()["bytes"] == 7
+
+
+def test_invalidate_removes_the_collection_and_object_of_one_account():
+  response_cache = ResponseCache(10, 1000, 60)
+  api_client = types.SimpleNamespace(api_key_id="key-1", host="https://intersight.com/api/v1")
+  other_api_client = types.SimpleNamespace(api_key_id="key-2", host="https://intersight.com/api/v1")
+  namespace = hx_policy_maker.get_cache_namespace(api_client)
+  other_namespace = hx_policy_maker.get_cache_namespace(other_api_client)
+  for cache_key in (namespace + " /hyperflex/SysConfigPolicies", namespace + " /hyperflex/SysConfigPolicies/moid-1", namespace + " /hyperflex/SysConfigPolicies/moid-2", namespace + " /hyperflex/NodeConfigPolicies", other_namespace + " /hyperflex/SysConfigPolicies"):
+    response_cache.store(cache_key, b"data")
+  response_cache.invalidate(api_client, "hyperflex/SysConfigPolicies", "moid-1")
+  assert sorted(response_cache.entries) == sorted([namespace + " /hyperflex/SysConfigPolicies/moid-2", namespace + " /hyperflex/NodeConfigPolicies", other_namespace + " /hyperflex/SysConfigPolicies"])
+  assert response_cache.get_stats()["invalidations"] == 2
+  assert response_cache.get_stats()["bytes"] == 12
+
+
+def test_saved_entries_are_loaded_within_the_limits(tmp_path):
+  cache_file = str(tmp_path / "response_cache.json")
+  response_cache = ResponseCache(10, 1000, 60)
+  for cache_key in ("a", "b", "c"):
+    response_cache.store(cache_key, b"data-" + cache_key.encode("utf-8"), etag="etag-" + cache_key)
+  response_cache.save(cache_file)
+  loaded_response_cache = ResponseCache(2, 1000, 60)
+  loaded_response_cache.load(cache_file)
+  assert list(loaded_response_cache.entries) == ["b", "c"]
+  assert loaded_response_cache.get("c")["data"] == b"data-c"
+  assert loaded_response_cache.get("c")["etag"] == "etag-c"
+  loaded_response_cache.load(str(tmp_path / "missing.json"))
+  assert loaded_response_cache.get_stats()["entries"] == 2
+
+
+@pytest.fixture
+def response_cache(monkeypatch):
+  response_cache = ResponseCache(10, 100000, 60)
+  monkeypatch.setattr(hx_policy_maker, "response_cache", response_cache)
+  return response_cache
+
+
+def test_cached_get_is_invalidated_by_writes(mock_server, api_client, response_cache):
+  hx_policy_maker.iu_post("hyperflex/SysConfigPolicies", {"Name": "policy-1"}, api_client)
+  assert len(hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"]) == 1
+  get_request_count = mock_server.get_stats().get("GET 200", 0)
+  assert len(hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"]) == 1
+  assert mock_server.get_stats().get("GET 200", 0) == get_request_count
+  hx_policy_maker.iu_post("hyperflex/SysConfigPolicies", {"Name": "policy-2"}, api_client)
+  assert len(hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"]) == 2
+  assert response_cache.get_stats()["hits"] == 1
+  assert response_cache.get_stats()["invalidations"] == 1
+
+
+def test_expired_entries_are_revalidated_with_mod_times(mock_server, api_client, response_cache):
+  response_cache.ttl = 0
+  hx_policy_maker.iu_post("hyperflex/SysConfigPolicies", {"Name": "policy-1"}, api_client)
+  existing_policy = hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"][0]
+  assert hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"] == [existing_policy]
+  assert response_cache.get_stats()["revalidated"] == 1
+
+  # An object changed by another client is downloaded again
+  mock_server.get_account_objects("test-key")["hyperflex/SysConfigPolicies"][existing_policy["Moid"]].update(Description="changed", ModTime="2099-01-01T00:00:00.000Z")
+  assert hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"][0]["Description"] == "changed"
+  assert response_cache.get_stats()["revalidated"] == 1
@@ -0,0 +1,82 @@
+"""
+Tests for the crash-safe run journal of the HyperFlex Edge Policy Maker.
+"""
+
+# Import needed Python modules
+import json
+from hx_policy_maker import RunJournal
+
+
+def write_interrupted_journal(journal_path):
+  """This is a function to write the journal of a run interrupted while writing a record.
+
+  Args:
+    journal_path: The path of the journal file to be written.
+  """
+  run_journal = RunJournal(100, 60)
+  run_journal.open(journal_path)
+  run_journal.record("planned", account="key-1@host", method="POST", api_path="hyperflex/SysConfigPolicies", name="sample-sys-config-policy")
+  run_journal.record("planned", account="key-1@host", method="POST", api_path="hyperflex/NodeConfigPolicies", name="sample-node-config-policy")
+  run_journal.record("completed", account="key-1@host", method="POST", api_path="hyperflex/SysConfigPolicies", name="sample-sys-config-policy", moid="moid-1", status=200)
+  run_journal.close()
+  with open(journal_path, "a") as journal_output:
+    journal_output.write('{"event": "compl')
+
+
+def test_resume_skips_completed_operations(tmp_path):
+  journal_path = str(tmp_path / "journal.jsonl")
+  write_interrupted_journal(journal_path)
+  run_journal = RunJournal(100, 60)
+  run_journal.open(journal_path, resume=True)
+  assert run_journal.is_completed("key-1@host", "hyperflex/SysConfigPolicies", "sample-sys-config-policy")
+  assert not run_journal.is_completed("key-1@host", "hyperflex/NodeConfigPolicies", "sample-node-config-policy")
+  assert not run_journal.is_completed("key-2@host", "hyperflex/SysConfigPolicies", "sample-sys-config-policy")
+  run_journal.close()
+
+
+def test_resume_drops_a_torn_record(tmp_path):
+  journal_path = str(tmp_path / "journal.jsonl")
+  write_interrupted_journal(journal_path)
+  run_journal = RunJournal(100, 60)
+  run_journal.open(journal_path, resume=True)
+  run_journal.record("completed", account="key-1@host", method="POST", api_path="hyperflex/NodeConfigPolicies", name="sample-node-config-policy", moid="moid-2", status=200)
+  run_journal.close()
+  with open(journal_path) as journal_input:
+    journal_records = [json.loads(journal_line) for journal_line in journal_input]
+  assert len(journal_records) == 4
+  assert journal_records[-1]["moid"] == "moid-2"
+
+
+def test_planned_operations_are_in_doubt_until_completed(tmp_path):
+  journal_path = str(tmp_path / "journal.jsonl")
+  write_interrupted_journal(journal_path)
+  run_journal = RunJournal(100, 60)
+  run_journal.open(journal_path, resume=True)
+  assert run_journal.is_in_doubt("key-1@host", "hyperflex/NodeConfigPolicies", "sample-node-config-policy")
+  assert not run_journal.is_in_doubt("key-1@host", "hyperflex/SysConfigPolicies", "sample-sys-config-policy")
+  run_journal.record("completed", account="key-1@host", method="POST", api_path="hyperflex/NodeConfigPolicies", name="sample-node-config-policy", moid=None, status=409)
+  assert run_journal.is_in_doubt("key-1@host", "hyperflex/NodeConfigPolicies", "sample-node-config-policy")
+  run_journal.record("completed", account="key-1@host", method="RECONCILE", api_path="hyperflex/NodeConfigPolicies", name="sample-node-config-policy", moid=None, status="unchanged")
+  assert not run_journal.is_in_doubt("key-1@host", "hyperflex/NodeConfigPolicies", "sample-node-config-policy")
+  run_journal.close()
+
+
+def test_delete_clears_a_completed_operation(tmp_path):
+  journal_path = str(tmp_path / "journal.jsonl")
+  write_interrupted_journal(journal_path)
+  run_journal = RunJournal(100, 60)
+  run_journal.open(journal_path, resume=True)
+  run_journal.record("completed", account="key-1@host", method="DELETE", api_path="hyperflex/SysConfigPolicies", moid="moid-1", status=200)
+  assert not run_journal.is_completed("key-1@host", "hyperflex/SysConfigPolicies", "sample-sys-config-policy")
+  run_journal.close()
+
+
+def test_open_without_resume_starts_over(tmp_path):
+  journal_path = str(tmp_path / "journal.jsonl")
+  write_interrupted_journal(journal_path)
+  run_journal = RunJournal(100, 60)
+  run_journal.open(journal_path)
+  run_journal.close()
+  assert not run_journal.completed_operations
+  with open(journal_path) as journal_input:
+    assert journal_input.read() == ""
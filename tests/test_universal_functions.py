@@ -0,0 +1,168 @@
+"""
+Tests for the Intersight Universal Functions of the HyperFlex Edge Policy Maker, run against the mock Intersight
+server.
+"""
+
+# Import needed Python modules
+import pytest
+import hx_policy_maker
+
+
+@pytest.mark.parametrize("journal_open", [False, True])
+def test_writes_release_the_connection_with_the_body_read(api_client, tmp_path, journal_open):
+  retry_count = hx_policy_maker.request_scheduler.get_stats()["retries"]
+  if journal_open:
+    hx_policy_maker.run_journal.open(str(tmp_path / "journal.jsonl"))
+  try:
+    assert hx_policy_maker.iu_post("hyperflex/SysConfigPolicies", {"Name": "policy-1"}, api_client) == "The POST method was successful."
+    existing_policy = hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"][0]
+    assert hx_policy_maker.iu_patch_moid("hyperflex/SysConfigPolicies", existing_policy["Moid"], {"Description": "updated"}, api_client) == "The PATCH method was successful."
+    assert hx_policy_maker.iu_delete_moid("hyperflex/SysConfigPolicies", existing_policy["Moid"], api_client) == "The DELETE method was successful."
+    assert hx_policy_maker.iu_post("hyperflex/SysConfigPolicies", {"Name": "policy-2"}, api_client) == "The POST method was successful."
+    assert [result["Name"] for result in hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"]] == ["policy-2"]
+  finally:
+    hx_policy_maker.run_journal.close()
+  assert hx_policy_maker.request_scheduler.get_stats()["retries"] == retry_count
+
+
+def create_policies(api_client,policy_count,api_path="hyperflex/SysConfigPolicies"):
+  """This is a function to create policies named policy-0 to policy-<N-1> in the mock Intersight server.
+
+  Args:
+    api_client: The Intersight API client stand-in.
+    policy_count: The number of policies to be created.
+    api_path: The path to the Intersight API type of the policies. The default value is
+      "hyperflex/SysConfigPolicies".
+  """
+  for policy_number in range(policy_count):
+    assert hx_policy_maker.iu_post(api_path, {"Name": "policy-" + str(policy_number)}, api_client) == "The POST method was successful."
+
+
+def count_get_requests(mock_server):
+  return sum(request_count for request_key, request_count in mock_server.get_stats().items() if request_key.startswith("GET"))
+
+
+def test_get_paged_walks_every_page_in_moid_order(mock_server, api_client):
+  create_policies(api_client, 7)
+  get_request_count = count_get_requests(mock_server)
+  paged_policies = list(hx_policy_maker.iu_get_paged("hyperflex/SysConfigPolicies", page_size=3, api_client=api_client))
+  assert sorted(paged_policy["Name"] for paged_policy in paged_policies) == ["policy-" + str(policy_number) for policy_number in range(7)]
+  assert [paged_policy["Moid"] for paged_policy in paged_policies] == sorted(paged_policy["Moid"] for paged_policy in paged_policies)
+  assert count_get_requests(mock_server) - get_request_count == 3
+
+
+def test_get_paged_stops_early(mock_server, api_client):
+  create_policies(api_client, 7)
+  get_request_count = count_get_requests(mock_server)
+  assert len(list(hx_policy_maker.iu_get_paged("hyperflex/SysConfigPolicies", page_size=3, max_results=4, api_client=api_client))) == 4
+  assert count_get_requests(mock_server) - get_request_count == 2
+  next(hx_policy_maker.iu_get_paged("hyperflex/SysConfigPolicies", page_size=3, api_client=api_client))
+  assert count_get_requests(mock_server) - get_request_count == 3
+
+
+def test_get_paged_filter_and_select(api_client):
+  create_policies(api_client, 3)
+  paged_policies = list(hx_policy_maker.iu_get_paged("hyperflex/SysConfigPolicies", query_filter="Name eq 'policy-1'", select=["Name"], api_client=api_client))
+  assert [paged_policy["Name"] for paged_policy in paged_policies] == ["policy-1"]
+  assert "Description" not in paged_policies[0]
+
+
+def test_get_paged_errors(api_client):
+  assert list(hx_policy_maker.iu_get_paged("hyperflex/UnknownPolicies", api_client=api_client)) == []
+  with pytest.raises(Exception):
+    list(hx_policy_maker.iu_get_paged("hyperflex/UnknownPolicies", api_client=api_client, raise_errors=True))
+
+
+def test_body_matches_object():
+  assert hx_policy_maker.body_matches_object({"Name": "policy-1", "Settings": {"Mtu": 9000}}, {"Name": "policy-1", "Moid": "1", "Settings": {"Mtu": 9000, "Vlan": 10}})
+  assert hx_policy_maker.body_matches_object({"Name": "policy-1", "Password": "secret"}, {"Name": "policy-1"})
+  assert not hx_policy_maker.body_matches_object({"Settings": {"Mtu": 9000}}, {"Settings": {"Mtu": 1500}})
+  assert not hx_policy_maker.body_matches_object({"Settings": {"Mtu": 9000}}, {"Settings": None})
+  assert hx_policy_maker.body_matches_object({"Servers": ["10.0.0.1", {"Port": 53}]}, {"Servers": ["10.0.0.1", {"Port": 53, "Moid": "1"}]})
+  assert not hx_policy_maker.body_matches_object({"Servers": ["10.0.0.1"]}, {"Servers": ["10.0.0.1", "10.0.0.2"]})
+  assert not hx_policy_maker.body_matches_object({"Servers": ["10.0.0.1"]}, {"Servers": "10.0.0.1"})
+
+
+def count_write_requests(mock_server):
+  return sum(request_count for request_key, request_count in mock_server.get_stats().items() if not request_key.startswith("GET"))
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_reconcile_plans_posts_patches_and_unchanged_objects(mock_server, api_client, bulk):
+  create_policies(api_client, 2)
+  object_requests = [
+    ("hyperflex/SysConfigPolicies", {"Name": "policy-0", "Password": "secret"}),
+    ("hyperflex/SysConfigPolicies", {"Name": "policy-1", "Description": "updated"}),
+    ("hyperflex/SysConfigPolicies", {"Name": "policy-2", "Description": "new"}),
+    ("hyperflex/UnknownPolicies", {"Name": "policy-3"})
+  ]
+  for existing_policy in hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"]:
+    hx_policy_maker.iu_patch_moid("hyperflex/SysConfigPolicies", existing_policy["Moid"], {"Description": "original"}, api_client)
+  write_request_count = count_write_requests(mock_server)
+  assert hx_policy_maker.iu_reconcile(object_requests, api_client=api_client, bulk=bulk) == [
+    "No changes were needed.",
+    "The PATCH method was successful.",
+    "The POST method was successful.",
+    "The lookup of the existing objects failed."
+  ]
+  assert count_write_requests(mock_server) - write_request_count == (1 if bulk else 2)
+  existing_policies = {existing_policy["Name"]: existing_policy for existing_policy in hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"]}
+  assert existing_policies["policy-1"]["Description"] == "updated"
+  assert existing_policies["policy-2"]["Description"] == "new"
+  assert "Password" not in existing_policies["policy-0"]
+
+  # A second run finds every object already in place and writes nothing
+  write_request_count = count_write_requests(mock_server)
+  assert hx_policy_maker.iu_reconcile(object_requests[:3], api_client=api_client, bulk=bulk) == ["No changes were needed."] * 3
+  assert count_write_requests(mock_server) == write_request_count
+
+
+def test_bulk_maps_each_result_to_its_sub_request(mock_server, api_client, monkeypatch):
+  monkeypatch.setattr(hx_policy_maker, "bulk_request_max_size", 2)
+  create_policies(api_client, 2)
+  existing_policies = {existing_policy["Name"]: existing_policy for existing_policy in hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"]}
+  bulk_request_count = mock_server.get_stats().get("POST 200", 0)
+  sub_requests = [
+    ("POST", "hyperflex/SysConfigPolicies", None, {"Name": "policy-2"}),
+    ("POST", "hyperflex/SysConfigPolicies", None, {"Name": "policy-0"}),
+    ("PATCH", "hyperflex/SysConfigPolicies", existing_policies["policy-1"]["Moid"], {"Description": "updated"}),
+    ("DELETE", "hyperflex/SysConfigPolicies", existing_policies["policy-0"]["Moid"], None),
+    ("DELETE", "hyperflex/SysConfigPolicies", "missing-moid", None)
+  ]
+  assert hx_policy_maker.iu_bulk(sub_requests, api_client) == [
+    "The POST method was successful.",
+    "The POST method failed.",
+    "The PATCH method was successful.",
+    "The DELETE method was successful.",
+    "The DELETE method failed."
+  ]
+  assert mock_server.get_stats().get("POST 200", 0) - bulk_request_count == 3
+  assert sorted((existing_policy["Name"], existing_policy.get("Description")) for existing_policy in hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"]) == [("policy-1", "updated"), ("policy-2", None)]
+
+
+def test_bulk_reports_every_operation_of_a_failed_request_as_failed(mock_server, api_client, monkeypatch):
+  monkeypatch.setattr(mock_server, "handle_bulk_request", lambda body, api_key_id: (400, {"code": "InvalidRequest"}))
+  post_requests = [("hyperflex/SysConfigPolicies", {"Name": "policy-" + str(policy_number)}) for policy_number in range(3)]
+  assert hx_policy_maker.iu_post_bulk(post_requests, api_client) == ["The POST method failed."] * 3
+  assert hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"] == []
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_delete_matching_reports_failed_lookups(mock_server, api_client, monkeypatch, bulk):
+  create_policies(api_client, 3)
+  create_policies(api_client, 2, api_path="hyperflex/NodeConfigPolicies")
+  hx_policy_maker.iu_post("hyperflex/SysConfigPolicies", {"Name": "other-policy"}, api_client)
+  handle_request = mock_server.handle_request
+
+  def failing_handle_request(method,path,query,body,api_key_id=""):
+    if method == "GET" and path.endswith("/hyperflex/NodeConfigPolicies"):
+      return 403, {"code": "Forbidden", "message": "Access denied."}
+    return handle_request(method, path, query, body, api_key_id)
+
+  monkeypatch.setattr(mock_server, "handle_request", failing_handle_request)
+  delete_results = hx_policy_maker.iu_delete_matching(["hyperflex/SysConfigPolicies", "hyperflex/NodeConfigPolicies"], "startswith(Name,'policy-')", api_client=api_client, bulk=bulk)
+  assert delete_results[0] == {"api_path": "hyperflex/NodeConfigPolicies", "name": None, "moid": None, "result": "The lookup of the matching objects failed."}
+  assert sorted((delete_result["name"], delete_result["result"]) for delete_result in delete_results[1:]) == [("policy-" + str(policy_number), "The DELETE method was successful.") for policy_number in range(3)]
+  monkeypatch.setattr(mock_server, "handle_request", handle_request)
+  assert [existing_policy["Name"] for existing_policy in hx_policy_maker.iu_get("hyperflex/SysConfigPolicies", api_client)["Results"]] == ["other-policy"]
+  assert len(hx_policy_maker.iu_get("hyperflex/NodeConfigPolicies", api_client)["Results"]) == 2